@@ -2,8 +2,25 @@
 from petri_net import PetriNet
 
 class AdaptiveController:
-    def __init__(self, poles, approach_pole_map):
-        self.net = PetriNet()
+    def __init__(self, poles, approach_pole_map, net_cls=PetriNet,
+                 base_green=5, green_per_vehicle=1.0, max_green=15,
+                 yellow_time=None, red_yellow_time=None, net_file=None):
+        # net_cls: PetriNet, petri_net_np.MatrixPetriNet for the array backend,
+        # or petri_compiled.CompiledPetriNet for generated firing code
+        # net_file: .json/.pnml net to run instead of the built-in one; it must
+        # have the same P_<d>_* places and T_<d>_* transitions (see petri_io).
+        # yellow_time / red_yellow_time: seconds (default 3.0); with a net_file,
+        # None keeps the file's timings and a value overrides them. The green
+        # settings always apply: the scheduler sets each green's duration.
+        if net_file is not None:
+            from petri_io import load_net
+            self.net = load_net(net_file, net_cls)
+        else:
+            self.net = net_cls()
+        # Green lasts base_green + green_per_vehicle * queue, capped at max_green
+        self.base_green = base_green
+        self.green_per_vehicle = green_per_vehicle
+        self.max_green = max_green
         self.poles = poles
         self.approach_pole_map = approach_pole_map
         self.active_direction = None # Currently Green direction
@@ -19,6 +36,18 @@ class AdaptiveController:
         self.transitions = {}
         
         for d in ["N", "E", "S", "W"]:
+            if net_file is not None:
+                self._bind_loaded(d)
+                if yellow_time is not None:
+                    self.transitions[d]["t_end_yellow"].min_time = yellow_time
+                if red_yellow_time is not None:
+                    self.transitions[d]["t_end_ry"].min_time = red_yellow_time
+                continue
+            if yellow_time is None:
+                yellow_time = 3.0
+            if red_yellow_time is None:
+                red_yellow_time = 3.0
+
             # Places
             p_green = self.net.add_place(f"P_{d}_Green", 0)
             p_yellow = self.net.add_place(f"P_{d}_Yellow", 0)
@@ -33,17 +62,17 @@ class AdaptiveController:
             # Transitions
             
             # 1. End Green -> Start Yellow
-            t_end_green = self.net.add_transition(f"T_{d}_EndGreen", min_time=5) # Adaptive time
+            t_end_green = self.net.add_transition(f"T_{d}_EndGreen", min_time=base_green) # Adaptive time
             t_end_green.add_input(p_green)
             t_end_green.add_output(p_yellow)
             
             # 2. End Yellow -> Red (Consumes token)
-            t_end_yellow = self.net.add_transition(f"T_{d}_EndYellow", min_time=3.0) 
+            t_end_yellow = self.net.add_transition(f"T_{d}_EndYellow", min_time=yellow_time) 
             t_end_yellow.add_input(p_yellow)
             # Output is nothing (token consumed, light becomes Red)
             
             # 3. End RedYellow -> Green
-            t_end_ry = self.net.add_transition(f"T_{d}_EndRY", min_time=3.0) 
+            t_end_ry = self.net.add_transition(f"T_{d}_EndRY", min_time=red_yellow_time) 
             t_end_ry.add_input(p_red_yellow)
             t_end_ry.add_output(p_green)
             
@@ -53,6 +82,23 @@ class AdaptiveController:
                 "t_end_ry": t_end_ry
             }
             
+    def _bind_loaded(self, d):
+        """Look up direction d's places and transitions in a net read from a file."""
+        transitions = {t.name: t for t in self.net.transitions}
+        try:
+            self.places[d] = {
+                "green": self.net.places[f"P_{d}_Green"],
+                "yellow": self.net.places[f"P_{d}_Yellow"],
+                "red_yellow": self.net.places[f"P_{d}_RedYellow"],
+            }
+            self.transitions[d] = {
+                "t_end_green": transitions[f"T_{d}_EndGreen"],
+                "t_end_yellow": transitions[f"T_{d}_EndYellow"],
+                "t_end_ry": transitions[f"T_{d}_EndRY"],
+            }
+        except KeyError as e:
+            raise ValueError(f"Controller net is missing {e.args[0]}") from None
+
     def update(self, dt, vehicle_manager):
         # 1. Update Petri Net
         fired = self.net.update(dt)
@@ -60,6 +106,28 @@ class AdaptiveController:
             self.apply_states()
         
         # 2. Scheduler & Overlap Logic
+        self.schedule(vehicle_manager)
+
+    def run_until(self, end_time, vehicle_manager):
+        """Event-driven alternative to calling update() every frame.
+
+        Jumps the net straight from one firing to the next instead of
+        polling every 16 ms, running the scheduler after each firing just
+        as update() does on the following frame. vehicle_manager only needs
+        get_lane_info(direction), so a static demand table works for
+        controller-only runs. Returns the number of firings.
+        """
+        fired = 0
+        while True:
+            self.schedule(vehicle_manager)
+            if not self.net.advance_to(end_time, max_events=1):
+                break
+            self.apply_states()
+            fired += 1
+        return fired
+
+    def schedule(self, vehicle_manager):
+        """Inject Red-Yellow tokens when a direction needs to start its phase."""
         # Scan current states
         green_dir = None
         yellow_dir = None
@@ -92,7 +160,7 @@ class AdaptiveController:
                 # Setup Green duration for future
                 q_len, max_wait = vehicle_manager.get_lane_info(best_dir)
                 t_green = self.transitions[best_dir]["t_end_green"]
-                t_green.min_time = min(5 + q_len * 1.0, 15)
+                t_green.min_time = self.green_time(q_len)
                 
                 self.apply_states()
         
@@ -105,10 +173,13 @@ class AdaptiveController:
                  
                  q_len, max_wait = vehicle_manager.get_lane_info(best_dir)
                  t_green = self.transitions[best_dir]["t_end_green"]
-                 t_green.min_time = min(5 + q_len * 1.0, 15)
+                 t_green.min_time = self.green_time(q_len)
                  
                  self.apply_states()
 
+    def green_time(self, queue_length):
+        return min(self.base_green + queue_length * self.green_per_vehicle, self.max_green)
+
     def select_next_phase(self, vehicle_manager, exclude=[]):
         """Standard scheduler: Queue Length > Wait Time."""
         candidates = []
@@ -1,11 +1,12 @@
 class AutonomousController:
-    def __init__(self, poles, approach_pole_map):
+    def __init__(self, poles, approach_pole_map, t_green=5.0, t_switch=3.0):
         self.poles = poles
         self.approach_pole = approach_pole_map
+        self.approach_pole_map = approach_pole_map  # Same name as AdaptiveController (game modes)
         
         self.AUTO_ORDER = ["N", "E", "S", "W"]
-        self.T_GREEN = 5.0
-        self.T_SWITCH = 3.0
+        self.T_GREEN = t_green
+        self.T_SWITCH = t_switch
         
         self.auto_idx = 0
         self.auto_phase = "green"  # "green" or "switch"
@@ -35,10 +36,12 @@ class AutonomousController:
             self.set_approach_state(curr, "yellow")
             self.set_approach_state(nxt, "red_yellow")
 
-    def update(self, dt):
+    def update(self, dt, vehicle_manager=None):
         """
         Call every frame in autonomas mode.
         dt = seconds since last frame.
+        vehicle_manager is accepted (and ignored) so game modes can drive
+        either controller the same way.
         """
         self.auto_timer -= dt
         if self.auto_timer > 0:
@@ -53,3 +56,5 @@ class AutonomousController:
             self.auto_phase = "green"
             self.auto_idx = (self.auto_idx + 1) % len(self.AUTO_ORDER)
             self.auto_timer = self.T_GREEN
+
+        self.apply_states()
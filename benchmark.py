@@ -0,0 +1,326 @@
+# benchmark.py
+
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+
+# Rendering cases need a display surface; the dummy driver works without a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from adaptive_controller import AdaptiveController
+from layout import build_layout
+from petri_net import PetriNet
+from renderer import Renderer, VehicleView, load_sprites
+from simulation import SimulationEngine
+from vehicle import VehicleManager, TRAVEL_DIR
+
+DT = 1 / 60
+DIRECTIONS = ["N", "S", "E", "W"]
+LIGHTS = {"N": "green", "S": "green", "E": "red", "W": "yellow"}
+
+VEHICLE_SIZES = [10, 100, 1000, 10000]
+NET_SIZES = [12, 48, 192, 768]  # transitions (the controller's own net has 12), or tokens per place
+
+
+# --- Fixtures ---
+def populate(vehicle_manager, n, span=700.0):
+    """Put n vehicles on the lanes, spread evenly over the first `span` px of each.
+
+    Spawning is switched off so the population stays at n while timed.
+    At large n the vehicles overlap; that is fine for measuring cost.
+    """
+    for i in range(n):
+        vehicle_manager.spawn_vehicle(DIRECTIONS[i % 4], is_ambulance=(i % 10 == 9), force=True)
+    vehicle_manager.spawn_timer = float("inf")
+
+    for (direction, lane), queue in vehicle_manager.lanes.items():
+        dx, dy = TRAVEL_DIR[direction]
+        gap = span / max(len(queue), 1)
+        # Queue index 0 is the front of the lane
+        for i, v in enumerate(queue):
+            ahead = (len(queue) - 1 - i) * gap
+            v.x += dx * ahead
+            v.y += dy * ahead
+            v.update_rect()
+    return vehicle_manager
+
+
+def ring_net(net_cls, size, min_time=0.05):
+    """size places and transitions in a cycle, a token on every fourth place."""
+    net = net_cls()
+    places = [net.add_place(f"P{i}", 1 if i % 4 == 0 else 0) for i in range(size)]
+    for i in range(size):
+        t = net.add_transition(f"T{i}", min_time=min_time)
+        t.add_input(places[i])
+        t.add_output(places[(i + 1) % size])
+    return net
+
+
+def fresh_manager(n):
+    return populate(VehicleManager(build_layout()["road_info"]), n)
+
+
+# --- Cases ---
+# Each setup(size) builds fresh state and returns (fn, ops): one fn() call
+# performs `ops` operations of the thing being measured.
+
+def setup_petri_update(size):
+    net = ring_net(PetriNet, size)
+    return lambda: net.update(DT), 1
+
+
+def setup_petri_update_np(size):
+    from petri_net_np import MatrixPetriNet
+    net = ring_net(MatrixPetriNet, size)
+    net.compile()  # Build the arc arrays now, not inside the timed calls
+    return lambda: net.update(DT), 1
+
+
+def setup_petri_update_compiled(size):
+    from petri_compiled import CompiledPetriNet
+    net = ring_net(CompiledPetriNet, size)
+    net.code()  # Generate (or load from the cache) and import now, not inside the timed calls
+    return lambda: net.update(DT), 1
+
+
+def setup_petri_token_queue(size):
+    # A lane place holding `size` vehicle tokens; each call lets one leave and one arrive
+    net = PetriNet()
+    lane = net.add_place("lane", timed=True)
+    out = net.add_place("out")
+    t = net.add_transition("leave", min_time=DT * size)
+    t.add_input(lane)
+    t.add_output(out)
+    for i in range(size):
+        net.current_time += DT
+        lane.add_token(1, net.current_time, data=i)
+
+    def step():
+        if net.update(DT):
+            lane.add_token(1, net.current_time, data=out.tokens)
+    return step, 1
+
+
+def _controller(n):
+    layout = build_layout()
+    vm = fresh_manager(n)
+    controller = AdaptiveController(layout["poles"], layout["approach_map"])
+    controller.apply_states()
+    return controller, vm
+
+
+def setup_controller_update(size):
+    controller, vm = _controller(size)
+    return lambda: controller.update(DT, vm), 1
+
+
+def setup_select_next_phase(size):
+    controller, vm = _controller(size)
+    return lambda: controller.select_next_phase(vm, exclude=[]), 1
+
+
+def setup_vm_update(size):
+    vm = fresh_manager(size)
+    return lambda: vm.update(DT, LIGHTS), 1
+
+
+def setup_vehicle_move(size):
+    vm = fresh_manager(size)
+    vm.update(0.0, LIGHTS)  # Builds the spatial index without moving anyone
+    stop_lines = vm.road_info["stop_lines"]
+    index = vm.spatial_index
+    vehicles = [v for lane in vm.vehicles.values() for v in lane]
+
+    def fn():
+        for v in vehicles:
+            v.move(DT, v.leader, stop_lines[v.approach], LIGHTS[v.approach], spatial_index=index)
+    return fn, len(vehicles)
+
+
+def setup_spawn_vehicle(size):
+    road_info = build_layout()["road_info"]
+
+    def fn():
+        vm = VehicleManager(road_info)
+        for i in range(size):
+            vm.spawn_vehicle(DIRECTIONS[i % 4], force=True)
+    return fn, size
+
+
+def setup_render_frame(size):
+    layout = build_layout()
+    vm = fresh_manager(size)
+    renderer = Renderer(pygame.display.get_surface(), layout)
+
+    def fn():
+        renderer.begin_frame()
+        renderer.draw_entities([VehicleView(vm)])
+        renderer.end_frame()
+    return fn, 1
+
+
+def setup_engine_step(size):
+    engine = SimulationEngine(seed=0)
+    populate(engine.vehicle_manager, size)
+    return engine.step, 1
+
+
+def setup_frame(size):
+    """Simulation step plus a rendered frame: the interactive loop's per-frame work."""
+    engine = SimulationEngine(seed=0)
+    populate(engine.vehicle_manager, size)
+    renderer = Renderer(pygame.display.get_surface(), engine.layout)
+
+    def fn():
+        engine.step()
+        renderer.begin_frame()
+        renderer.draw_entities([VehicleView(engine.vehicle_manager)])
+        renderer.end_frame()
+    return fn, 1
+
+
+# name -> (setup, size axis)
+CASES = {
+    "petri_update": (setup_petri_update, "transitions"),
+    "petri_update_np": (setup_petri_update_np, "transitions"),
+    "petri_update_compiled": (setup_petri_update_compiled, "transitions"),
+    "petri_token_queue": (setup_petri_token_queue, "tokens"),
+    "controller_update": (setup_controller_update, "vehicles"),
+    "select_next_phase": (setup_select_next_phase, "vehicles"),
+    "vm_update": (setup_vm_update, "vehicles"),
+    "vehicle_move": (setup_vehicle_move, "vehicles"),
+    "spawn_vehicle": (setup_spawn_vehicle, "vehicles"),
+    "render_frame": (setup_render_frame, "vehicles"),
+    "engine_step": (setup_engine_step, "vehicles"),
+    "frame": (setup_frame, "vehicles"),
+}
+
+
+# --- Measurement ---
+def measure(setup, size, frames, repeat):
+    """Best-of-`repeat` time for `frames` calls on fresh state. Returns ns per call and per op."""
+    best = None
+    ops = 1
+    for _ in range(repeat):
+        fn, ops = setup(size)
+        fn()  # Untimed: first-call caches and lazy builds would otherwise land on the smallest sizes
+        start = time.perf_counter_ns()
+        for _ in range(frames):
+            fn()
+        elapsed = time.perf_counter_ns() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    per_call = best / frames
+    return {"ns_per_call": per_call, "ns_per_op": per_call / max(ops, 1), "ops": ops}
+
+
+def scaling_exponent(points):
+    """Least-squares slope of log(time per call) against log(size): 1.0 is linear."""
+    if len(points) < 2:
+        return None
+    xs = [math.log(size) for size, _ in points]
+    ys = [math.log(ns) for _, ns in points]
+    mx, my = sum(xs) / len(xs), sum(ys) / len(ys)
+    sxx = sum((x - mx) ** 2 for x in xs)
+    if sxx == 0:
+        return None
+    return sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / sxx
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(cases, vehicle_sizes, net_sizes, frames, repeat, log=print):
+    results = {}
+    for name in cases:
+        setup, axis = CASES[name]
+        sizes = vehicle_sizes if axis == "vehicles" else net_sizes
+        rows = {}
+        for size in sizes:
+            rows[str(size)] = measure(setup, size, frames, repeat)
+            log(f"{name:<18}{axis:>12} {size:>6}  {rows[str(size)]['ns_per_call']:>14,.0f} ns/call"
+                f"  {rows[str(size)]['ns_per_op']:>12,.0f} ns/op")
+        exponent = scaling_exponent([(int(s), r["ns_per_call"]) for s, r in rows.items()])
+        results[name] = {"axis": axis, "sizes": rows, "exponent": exponent}
+        if exponent is not None:
+            log(f"{name:<18}{'scaling':>12} n^{exponent:.2f}")
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "frames": frames,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(old, new, threshold=0.10):
+    """Per case/size ratio new/old. Returns (report lines, number of regressions)."""
+    lines = [f"{'case':<18}{'size':>7}{'old ns':>14}{'new ns':>14}{'ratio':>8}",
+             "-" * 61]
+    regressions = 0
+    for name, entry in new["results"].items():
+        old_entry = old["results"].get(name)
+        if old_entry is None:
+            continue
+        for size, row in entry["sizes"].items():
+            old_row = old_entry["sizes"].get(size)
+            if old_row is None:
+                continue
+            ratio = row["ns_per_call"] / old_row["ns_per_call"]
+            flag = ""
+            if ratio > 1 + threshold:
+                flag = "  slower"
+                regressions += 1
+            elif ratio < 1 - threshold:
+                flag = "  faster"
+            lines.append(f"{name:<18}{size:>7}{old_row['ns_per_call']:>14,.0f}"
+                         f"{row['ns_per_call']:>14,.0f}{ratio:>8.2f}{flag}")
+    return lines, regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the simulation's hot paths at controlled sizes.")
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--sizes", nargs="+", type=int, default=VEHICLE_SIZES, help="vehicle counts")
+    parser.add_argument("--net-sizes", nargs="+", type=int, default=NET_SIZES, help="Petri net transition counts")
+    parser.add_argument("--frames", type=int, default=20, help="calls timed per measurement")
+    parser.add_argument("--repeat", type=int, default=3, help="measurements per size (best is kept)")
+    parser.add_argument("--out", metavar="PATH", help="write results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a previous JSON result")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change reported as slower/faster")
+    args = parser.parse_args()
+
+    pygame.init()
+    layout = build_layout()
+    pygame.display.set_mode((layout["width"], layout["height"]))
+    load_sprites()
+
+    report = run_benchmarks(args.cases, args.sizes, args.net_sizes, args.frames, args.repeat)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        lines, regressions = compare(old, report, args.threshold)
+        print(f"\nvs {old.get('commit') or args.compare}:")
+        print("\n".join(lines))
+        if regressions:
+            print(f"\n{regressions} measurement(s) slower by more than {args.threshold:.0%}")
+            sys.exit(1)
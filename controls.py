@@ -0,0 +1,21 @@
+# controls.py
+
+import pygame
+
+from game_modes import ACTIVATE, UP, DOWN, LEFT, RIGHT
+
+# Keys that drive the game modes (WASD moves the pole selection)
+KEY_COMMANDS = {
+    pygame.K_SPACE: ACTIVATE,
+    pygame.K_w: UP,
+    pygame.K_s: DOWN,
+    pygame.K_a: LEFT,
+    pygame.K_d: RIGHT,
+}
+
+
+def command_for(event):
+    """Game mode command for a pygame event, or None."""
+    if event.type == pygame.KEYDOWN:
+        return KEY_COMMANDS.get(event.key)
+    return None
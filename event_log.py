@@ -0,0 +1,133 @@
+# event_log.py
+
+import json
+import queue
+import struct
+import threading
+from array import array
+
+# Small-int codes used in the logs (index = code)
+APPROACHES = ["N", "S", "E", "W"]
+APPROACH_CODE = {d: i for i, d in enumerate(APPROACHES)}
+VEHICLE_EVENTS = ["spawn", "stop", "cross", "exit"]
+VEHICLE_EVENT_CODE = {k: i for i, k in enumerate(VEHICLE_EVENTS)}
+LIGHT_STATES = ["red", "red_yellow", "green", "yellow"]
+LIGHT_STATE_CODE = {s: i for i, s in enumerate(LIGHT_STATES)}
+
+# Column layouts: (name, array typecode)
+VEHICLE_COLUMNS = [("time", "d"), ("vehicle", "q"), ("approach", "b"), ("event", "b"),
+                   ("wait", "d"), ("stops", "h")]
+PHASE_COLUMNS = [("time", "d"), ("approach", "b"), ("state", "b"), ("prev_state", "b"),
+                 ("prev_duration", "d")]
+
+MAGIC = b"TLOG"
+VERSION = 1
+
+
+class ColumnBuffer:
+    """Fixed-capacity columnar buffer of typed arrays, allocated once.
+
+    append() writes one row in place. When the buffer fills, the filled
+    rows are copied out as a chunk {column: array} and handed to `sink`
+    (e.g. ChunkWriter.submit), and the buffer starts over. Without a sink
+    full chunks are dropped, so memory stays bounded either way.
+    """
+
+    def __init__(self, columns, capacity=4096, sink=None):
+        self.columns = columns
+        self.capacity = capacity
+        self.sink = sink
+        self.arrays = [array(code, [0]) * capacity for _, code in columns]
+        self.n = 0
+        self.rows_total = 0
+
+    def append(self, *row):
+        n = self.n
+        for arr, value in zip(self.arrays, row):
+            arr[n] = value
+        self.n = n + 1
+        self.rows_total += 1
+        if self.n == self.capacity:
+            self.flush()
+
+    def chunk(self):
+        """Copy of the rows currently buffered."""
+        return {name: arr[:self.n] for (name, _), arr in zip(self.columns, self.arrays)}
+
+    def flush(self):
+        if self.n and self.sink is not None:
+            self.sink(self.chunk())
+        self.n = 0
+
+
+class ChunkWriter:
+    """Writes chunks to a CSV or binary file on a background thread.
+
+    The simulation thread only enqueues a chunk (already a private copy),
+    so slow disks never stall the loop. close() drains the queue.
+
+    Binary layout: MAGIC, u16 version, u32 header length, JSON header
+    {"columns": [[name, typecode], ...]}, then per chunk a u32 row count
+    followed by each column's raw array bytes (native byte order).
+    """
+
+    def __init__(self, path, columns, fmt="csv"):
+        if fmt not in ("csv", "bin"):
+            raise ValueError(f"Unknown export format: {fmt}")
+        self.path = path
+        self.columns = columns
+        self.fmt = fmt
+        self.queue = queue.Queue()
+        self.file = open(path, "w" if fmt == "csv" else "wb")
+        self._write_header()
+        self.thread = threading.Thread(target=self._run, name=f"ChunkWriter({path})", daemon=True)
+        self.thread.start()
+
+    def _write_header(self):
+        if self.fmt == "csv":
+            self.file.write(",".join(name for name, _ in self.columns) + "\n")
+        else:
+            header = json.dumps({"columns": self.columns}).encode()
+            self.file.write(MAGIC + struct.pack("<HI", VERSION, len(header)) + header)
+
+    def submit(self, chunk):
+        self.queue.put(chunk)
+
+    def _run(self):
+        while True:
+            chunk = self.queue.get()
+            if chunk is None:
+                break
+            if self.fmt == "csv":
+                cols = [chunk[name] for name, _ in self.columns]
+                self.file.write("".join(",".join(map(str, row)) + "\n" for row in zip(*cols)))
+            else:
+                rows = len(chunk[self.columns[0][0]])
+                self.file.write(struct.pack("<I", rows))
+                for name, _ in self.columns:
+                    chunk[name].tofile(self.file)
+        self.file.close()
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+
+def read_binary(path):
+    """Load a binary log written by ChunkWriter into {column: array}."""
+    with open(path, "rb") as f:
+        if f.read(4) != MAGIC:
+            raise ValueError(f"{path} is not an event log")
+        version, header_len = struct.unpack("<HI", f.read(6))
+        if version != VERSION:
+            raise ValueError(f"Unsupported event log version: {version}")
+        columns = [tuple(c) for c in json.loads(f.read(header_len))["columns"]]
+        data = {name: array(code) for name, code in columns}
+        while True:
+            head = f.read(4)
+            if len(head) < 4:
+                break
+            (rows,) = struct.unpack("<I", head)
+            for name, _ in columns:
+                data[name].fromfile(f, rows)
+    return data
@@ -1,17 +1,29 @@
 # game_modes.py
 
-import pygame
+# Input reaches the modes as abstract commands, so the modes run without
+# pygame; controls.py maps keys to these.
+ACTIVATE = "activate"  # Step / force the selected pole's phase
+UP, DOWN, LEFT, RIGHT = "up", "down", "left", "right"  # Move the pole selection
 
 class GameMode:
     def __init__(self, controller, vehicle_manager):
         self.controller = controller
         self.vehicle_manager = vehicle_manager
         self.name = "Generic"
+        # Set by the driver: SimClock of the run and an optional replay.Recording
+        # that manual inputs are logged into.
+        self.clock = None
+        self.recorder = None
 
     def update(self, dt):
         pass
 
-    def handle_input(self, event, selected_pole=None):
+    def handle_input(self, command, selected_pole=None):
+        """React to an input command; returns the new selected pole (None: unchanged)."""
+        pass
+
+    def replay_input(self, kind, *args):
+        """Re-apply an input logged by a previous run."""
         pass
 
 
@@ -26,12 +38,8 @@ class AutomaticMode(GameMode):
         self.vehicle_manager.update(dt, self.get_light_states())
 
     def get_light_states(self):
-        res = {}
-        kp = {v: k for k, v in self.controller.approach_pole_map.items()} # idx -> "N"
-        for i, pole in enumerate(self.controller.poles):
-            if i in kp:
-                res[kp[i]] = pole["state"]
-        return res
+        poles = self.controller.poles
+        return {d: poles[i]["state"] for d, i in self.controller.approach_pole_map.items()}
 
 
 # game_modes.py
@@ -46,45 +54,55 @@ class ManualSurvivalMode(GameMode):
         self.controller.advance_time(dt)
         self.vehicle_manager.update(dt, self.get_light_states())
 
-    def handle_input(self, event, selected_pole=None):
-        if event.type == pygame.KEYDOWN:
-            # SPACE = "try advance the Petri net by one valid transition"
-            # (optional) require a selected pole so it feels like "I’m controlling"
-            if event.key == pygame.K_SPACE and selected_pole is not None:
-                # Map selected pole index back to direction
-                # approach_pole_map: {"N": 0, "S": 2, ...}
-                direction = None
-                for k, v in self.controller.approach_pole_map.items():
-                    if v == selected_pole:
-                        direction = k
-                        break
-                
-                if direction:
-                    # Check if ANY state in this direction is active
-                    states = self.controller.places[direction]
-                    if any(p.tokens > 0 for p in states.values()):
-                         self.controller.step_manual()
-                    else:
-                         self.controller.force_phase(direction)
-
-            # WASD navigation
-            if selected_pole is not None:
-                # 0: NW, 1: NE, 2: SW, 3: SE
-                if event.key == pygame.K_w: # Up
-                    if selected_pole == 2: return 0
-                    if selected_pole == 3: return 1
-                elif event.key == pygame.K_s: # Down
-                    if selected_pole == 0: return 2
-                    if selected_pole == 1: return 3
-                elif event.key == pygame.K_a: # Left
-                    if selected_pole == 1: return 0
-                    if selected_pole == 3: return 2
-                elif event.key == pygame.K_d: # Right
-                    if selected_pole == 0: return 1
-                    if selected_pole == 2: return 3
+    def handle_input(self, command, selected_pole=None):
+        # ACTIVATE = "try advance the Petri net by one valid transition"
+        # (optional) require a selected pole so it feels like "I’m controlling"
+        if command == ACTIVATE and selected_pole is not None:
+            # Map selected pole index back to direction
+            # approach_pole_map: {"N": 0, "S": 2, ...}
+            direction = None
+            for k, v in self.controller.approach_pole_map.items():
+                if v == selected_pole:
+                    direction = k
+                    break
+
+            if direction:
+                self.press(direction)
+
+        # Selection moves between poles
+        if selected_pole is not None:
+            # 0: NW, 1: NE, 2: SW, 3: SE
+            if command == UP:
+                if selected_pole == 2: return 0
+                if selected_pole == 3: return 1
+            elif command == DOWN:
+                if selected_pole == 0: return 2
+                if selected_pole == 1: return 3
+            elif command == LEFT:
+                if selected_pole == 1: return 0
+                if selected_pole == 3: return 2
+            elif command == RIGHT:
+                if selected_pole == 0: return 1
+                if selected_pole == 2: return 3
 
         return selected_pole
 
+    def press(self, direction):
+        """SPACE on a pole: step the active phase, or force this direction's phase."""
+        if self.recorder is not None:
+            self.recorder.record(self.clock.frame, "press", direction)
+
+        # Check if ANY state in this direction is active
+        states = self.controller.places[direction]
+        if any(p.tokens > 0 for p in states.values()):
+             self.controller.step_manual()
+        else:
+             self.controller.force_phase(direction)
+
+    def replay_input(self, kind, *args):
+        if kind == "press":
+            self.press(*args)
+
     get_light_states = AutomaticMode.get_light_states
 
 
@@ -0,0 +1,74 @@
+# geometry.py
+
+
+class Rect:
+    """Integer rectangle for the simulation core, so it runs without pygame.
+
+    Follows pygame.Rect where the core uses it: coordinates are truncated
+    to ints, edges that only touch do not collide, and inflate() splits
+    odd amounts the same way. It is a 4-item sequence, so pygame calls
+    (and pygame.Rect(rect)) take it as is.
+    """
+
+    __slots__ = ("x", "y", "w", "h")
+
+    def __init__(self, x, y, w, h):
+        self.x = int(x)
+        self.y = int(y)
+        self.w = int(w)
+        self.h = int(h)
+
+    left = property(lambda self: self.x)
+    top = property(lambda self: self.y)
+    width = property(lambda self: self.w)
+    height = property(lambda self: self.h)
+    right = property(lambda self: self.x + self.w)
+    bottom = property(lambda self: self.y + self.h)
+
+    @property
+    def size(self):
+        return self.w, self.h
+
+    @size.setter
+    def size(self, value):
+        self.w, self.h = int(value[0]), int(value[1])
+
+    @property
+    def center(self):
+        return self.x + self.w // 2, self.y + self.h // 2
+
+    @center.setter
+    def center(self, value):
+        self.x = int(value[0]) - self.w // 2
+        self.y = int(value[1]) - self.h // 2
+
+    def copy(self):
+        return Rect(self.x, self.y, self.w, self.h)
+
+    def inflate(self, dx, dy):
+        # int(d / 2) rounds towards zero, as pygame does for negative amounts
+        return Rect(self.x - int(dx / 2), self.y - int(dy / 2), self.w + dx, self.h + dy)
+
+    def colliderect(self, other):
+        x, y, w, h = other
+        return (self.w > 0 and self.h > 0 and w > 0 and h > 0
+                and self.x < x + w and x < self.x + self.w
+                and self.y < y + h and y < self.y + self.h)
+
+    def __iter__(self):
+        return iter((self.x, self.y, self.w, self.h))
+
+    def __len__(self):
+        return 4
+
+    def __getitem__(self, i):
+        return (self.x, self.y, self.w, self.h)[i]
+
+    def __eq__(self, other):
+        try:
+            return tuple(self) == tuple(other)
+        except TypeError:
+            return NotImplemented
+
+    def __repr__(self):
+        return f"Rect({self.x}, {self.y}, {self.w}, {self.h})"
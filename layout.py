@@ -0,0 +1,70 @@
+# layout.py
+
+# Intersection geometry shared by the pygame front-end (main.py) and the
+# headless simulation engine. Everything here is plain numbers so it can be
+# built without opening a window.
+
+W, H = 1000, 700
+ROAD_WIDTH = 220
+CROSS_SIZE = 260
+
+
+def build_layout(width=W, height=H, road_width=ROAD_WIDTH, cross_size=CROSS_SIZE):
+    cx, cy = width // 2, height // 2
+
+    # Intersection box edges
+    top = cy - cross_size // 2
+    bottom = top + cross_size
+    left = cx - cross_size // 2
+    right = left + cross_size
+
+    # --- Road Info for Vehicles ---
+    # N=Southbound (Top->Bottom), S=Northbound (Bottom->Top), E=Westbound (Right->Left), W=Eastbound (Left->Right)
+    # (Based on standard RHT)
+    starts = {
+        "N": (cx - road_width // 4, -60),
+        "S": (cx + road_width // 4, height + 60),
+        "E": (width + 60, cy - road_width // 4),
+        "W": (-60, cy + road_width // 4),
+    }
+
+    # Stop Lines (Approximate Y or X values)
+    stop_lines = {
+        "N": top - 20,
+        "S": bottom + 20,
+        "E": right + 20,
+        "W": left - 20,
+    }
+
+    road_info = {
+        "starts": starts,
+        "stop_lines": stop_lines,
+    }
+
+    # --- Traffic Poles ---
+    # 0: NW, 1: NE, 2: SW, 3: SE
+    poles = [
+        {"name": "NW", "pos": (left - 35, top - 80), "state": "red"},
+        {"name": "NE", "pos": (right + 35, top - 80), "state": "red"},
+        {"name": "SW", "pos": (left - 35, bottom + 20), "state": "red"},
+        {"name": "SE", "pos": (right + 35, bottom + 20), "state": "red"},
+    ]
+
+    # Map Approach Direction to Pole Index
+    # N traffic (from top) -> Looks at NW signal (idx 0)
+    # E traffic (from right) -> Looks at NE signal (idx 1)
+    # S traffic (from bottom) -> Looks at SE signal (idx 3)
+    # W traffic (from left) -> Looks at SW signal (idx 2)
+    approach_map = {"N": 0, "E": 1, "S": 3, "W": 2}
+
+    return {
+        "width": width,
+        "height": height,
+        "cx": cx,
+        "cy": cy,
+        "road_width": road_width,
+        "cross_size": cross_size,
+        "road_info": road_info,
+        "poles": poles,
+        "approach_map": approach_map,
+    }
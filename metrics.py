@@ -1,46 +1,143 @@
-import pygame
+import time
+
+from event_log import (ColumnBuffer, ChunkWriter, VEHICLE_COLUMNS, PHASE_COLUMNS,
+                       APPROACH_CODE, VEHICLE_EVENT_CODE, LIGHT_STATE_CODE)
+
 
 class Metrics:
-    def __init__(self):
+    def __init__(self, clock=None, export_prefix=None, export_format="csv", chunk_rows=4096):
+        """
+        export_prefix: stream the event logs to <prefix>-vehicles.<ext> and
+                       <prefix>-phases.<ext> (ext "csv" or "bin"); call close() at the end.
+                       The time column is clock time, so it keeps rising across reset().
+        """
+        self.total_cars_exited = 0
+        self.max_queue_length = 0
+        self.total_wait_time = 0
+        self.total_stops = 0
+        self.total_crossed = 0
+        # Simulated time when a SimClock is given, wall-clock seconds otherwise
+        self.clock = clock
+        self.start_time = self.now()
+
+        # Light phases: approach -> (state, since); state -> [count, total, max] seconds
+        self.light_states = {}
+        self.phase_stats = {}
+
+        self.writers = []
+        vehicle_sink = phase_sink = None
+        if export_prefix is not None:
+            vehicle_writer = ChunkWriter(f"{export_prefix}-vehicles.{export_format}", VEHICLE_COLUMNS, export_format)
+            phase_writer = ChunkWriter(f"{export_prefix}-phases.{export_format}", PHASE_COLUMNS, export_format)
+            self.writers = [vehicle_writer, phase_writer]
+            vehicle_sink, phase_sink = vehicle_writer.submit, phase_writer.submit
+        self.vehicle_log = ColumnBuffer(VEHICLE_COLUMNS, chunk_rows, vehicle_sink)
+        self.phase_log = ColumnBuffer(PHASE_COLUMNS, 1024, phase_sink)
+
+    def reset(self):
+        """Start the totals and phase statistics over; event logs and exports carry on.
+
+        Lights keep their phase starts (clock times), so a phase running
+        across the reset is counted in full when it ends.
+        """
         self.total_cars_exited = 0
         self.max_queue_length = 0
         self.total_wait_time = 0
-        self.start_time = pygame.time.get_ticks()
-        
-    def update(self, vehicle_manager):
-        # Scan queues
+        self.total_stops = 0
+        self.total_crossed = 0
+        self.start_time = self.now()
+        self.phase_stats = {}
+
+    def now(self):
+        if self.clock is not None:
+            return self.clock.now
+        return time.monotonic()
+
+    def elapsed(self):
+        return self.now() - self.start_time
+
+    def update(self, vehicle_manager, light_states=None):
+        # Queue lengths come from the manager's running per-approach counters
         current_max_q = 0
-        for direction, lane in vehicle_manager.vehicles.items():
-            if len(lane) > current_max_q:
-                current_max_q = len(lane)
-            
-            # Simple wait time heuristic:
-            # If car speed is near 0, add to wait time?
-            # Or just track total waiting cars.
-            pass
-            
+        for direction in vehicle_manager.vehicles:
+            q_len = vehicle_manager.get_lane_info(direction)[0]
+            if q_len > current_max_q:
+                current_max_q = q_len
+
         if current_max_q > self.max_queue_length:
             self.max_queue_length = current_max_q
 
-    def draw(self, surface, font):
-        # Draw overlay
-        # Background
-        bg_rect = pygame.Rect(10, 80, 220, 110)
-        pygame.draw.rect(surface, (0, 0, 0, 180), bg_rect, border_radius=8)
-        pygame.draw.rect(surface, (255, 255, 255), bg_rect, 2, border_radius=8)
-        
-        # Text
-        elapsed = (pygame.time.get_ticks() - self.start_time) / 1000.0
-        
-        lines = [
+        # Log rows carry clock time, not elapsed(): exports stay monotonic across reset()
+        now = self.now()
+
+        # Vehicle events raised by this tick's vehicle_manager.update()
+        append = self.vehicle_log.append
+        for kind, v in vehicle_manager.events:
+            append(now, v.id, APPROACH_CODE[v.approach], VEHICLE_EVENT_CODE[kind], v.wait_time, v.stops)
+            if kind == "exit":
+                self.total_cars_exited += 1
+                self.total_wait_time += v.wait_time
+                self.total_stops += v.stops
+            elif kind == "cross":
+                self.total_crossed += 1
+
+        if light_states:
+            # Phases are timed on the clock too, so reset() cannot split one across two time bases
+            self._update_lights(light_states, now)
+
+    def _update_lights(self, light_states, now):
+        """Log every light change and fold the finished phase into phase_stats."""
+        for direction, state in light_states.items():
+            prev = self.light_states.get(direction)
+            if prev is not None and prev[0] == state:
+                continue
+            self.light_states[direction] = (state, now)
+            if prev is None:
+                # First sight of this light; its phase start is unknown
+                self.phase_log.append(now, APPROACH_CODE[direction], LIGHT_STATE_CODE[state], -1, 0.0)
+                continue
+            prev_state, since = prev
+            duration = now - since
+            self.phase_log.append(now, APPROACH_CODE[direction], LIGHT_STATE_CODE[state],
+                                  LIGHT_STATE_CODE[prev_state], duration)
+            stats = self.phase_stats.get(prev_state)
+            if stats is None:
+                self.phase_stats[prev_state] = [1, duration, duration]
+            else:
+                stats[0] += 1
+                stats[1] += duration
+                if duration > stats[2]:
+                    stats[2] = duration
+
+    def summary(self):
+        """Running totals: throughput, mean delay and stops per exited vehicle, phase durations."""
+        elapsed = self.elapsed()
+        exited = self.total_cars_exited
+        return {
+            "exited": exited,
+            "crossed": self.total_crossed,
+            "throughput_per_hour": exited * 3600.0 / elapsed if elapsed > 0 else 0.0,
+            "mean_delay": self.total_wait_time / exited if exited else 0.0,
+            "stops_per_vehicle": self.total_stops / exited if exited else 0.0,
+            "max_queue": self.max_queue_length,
+            "phases": {state: {"count": c, "mean": total / c, "max": peak}
+                       for state, (c, total, peak) in self.phase_stats.items()},
+        }
+
+    def close(self):
+        """Write out the partial chunks and wait for the export threads."""
+        self.vehicle_log.flush()
+        self.phase_log.flush()
+        for writer in self.writers:
+            writer.close()
+        self.writers = []
+
+    def hud_lines(self):
+        elapsed = self.elapsed()
+        avg_wait = self.total_wait_time / self.total_cars_exited if self.total_cars_exited else 0.0
+        return [
             f"Time: {elapsed:.1f}s",
             f"Max Queue: {self.max_queue_length}",
             f"Total Throughput: {self.total_cars_exited or 0}",
-            # f"Avg Speed: {0}"
+            f"Avg Wait: {avg_wait:.1f}s",
         ]
-        
-        y = 90
-        for line in lines:
-            txt = font.render(line, True, (255, 255, 255))
-            surface.blit(txt, (20, y))
-            y += 25
@@ -0,0 +1,200 @@
+# network.py
+
+import argparse
+import heapq
+import itertools
+import time
+from collections import deque
+
+from adaptive_controller import AdaptiveController
+from vehicle import VehicleManager
+from game_modes import AutomaticMode
+from layout import build_layout
+from sim_clock import SimClock, fresh_seed, rng_streams
+
+# Where a vehicle of each approach (direction it comes FROM) drives to:
+# (row step, column step). Vehicles go straight through every junction.
+APPROACH_STEP = {"N": (1, 0), "S": (-1, 0), "E": (0, -1), "W": (0, 1)}
+
+
+class Intersection:
+    """One node of the grid: its own controller, vehicle lanes and mode."""
+
+    def __init__(self, row, col, layout, clock, rng, spawn_directions, spawn_interval,
+                 controller_cls=AdaptiveController, controller_kwargs=None, on_exit=None):
+        self.row, self.col = row, col
+        self.vehicle_manager = VehicleManager(
+            layout["road_info"], spawn_interval, clock=clock, rng=rng,
+            spawn_directions=spawn_directions, on_exit=on_exit,
+        )
+        # Poles are mutable state, so every node gets its own copies
+        poles = [dict(p) for p in layout["poles"]]
+        self.controller = controller_cls(poles, layout["approach_map"], **(controller_kwargs or {}))
+        self.controller.apply_states()
+        self.mode = AutomaticMode(self.controller, self.vehicle_manager)
+
+    def update(self, dt):
+        self.mode.update(dt)
+
+
+class Link:
+    """Road between two neighbouring intersections, with a fixed travel time."""
+
+    def __init__(self, src, dst, travel_time):
+        self.src = src
+        self.dst = dst
+        self.travel_time = travel_time
+        self.in_transit = deque()  # (arrival time, vehicle), in arrival order
+
+    def push(self, vehicle, now):
+        self.in_transit.append((now + self.travel_time, vehicle))
+
+    def deliver(self, now):
+        in_transit = self.in_transit
+        while in_transit and in_transit[0][0] <= now:
+            self.dst.vehicle_manager.receive(in_transit.popleft()[1])
+
+
+class RoadNetwork:
+    """Grid of rows x cols intersections joined by two-way links.
+
+    Each intersection runs the single-junction model in its own local
+    coordinates (the standard layout); a vehicle that leaves one
+    intersection's area is carried along a Link to the next one in its
+    direction of travel and enters that intersection's matching approach.
+    New traffic only enters on the outer edges of the grid.
+
+    A partition of a larger grid is described by `origin` (row, col of this
+    instance's top-left node) and `shape` (rows, cols of the whole grid):
+    approaches facing the outside of the whole grid spawn traffic, and
+    vehicles heading to a node outside this partition are passed to
+    `on_leave(vehicle, (row, col))` instead of leaving the network.
+    """
+
+    def __init__(self, rows, cols, dt=0.1, seed=None, link_time=1.0, spawn_interval=(1.2, 3.0),
+                 controller_cls=AdaptiveController, controller_kwargs=None,
+                 origin=(0, 0), shape=None, on_leave=None):
+        self.rows, self.cols = rows, cols
+        self.dt = dt
+        self.seed = fresh_seed() if seed is None else seed
+        self.origin = origin
+        self.shape = shape or (rows, cols)
+        self.on_leave = on_leave
+        self.clock = SimClock()
+        self.layout = build_layout()
+
+        self.nodes = {}  # (row, col) in global grid coordinates -> Intersection
+        total_rows, total_cols = self.shape
+        for r in range(origin[0], origin[0] + rows):
+            for c in range(origin[1], origin[1] + cols):
+                spawn_directions = [d for d, (dr, dc) in APPROACH_STEP.items()
+                                    if not (0 <= r - dr < total_rows and 0 <= c - dc < total_cols)]
+                self.nodes[(r, c)] = Intersection(
+                    r, c, self.layout, self.clock,
+                    rng_streams(f"{self.seed}:{r},{c}")["spawn"],
+                    spawn_directions, spawn_interval,
+                    controller_cls, controller_kwargs,
+                    on_exit=lambda v, pos=(r, c): self._route(pos, v),
+                )
+
+        # (row, col, approach) -> Link leaving that node for that approach's direction
+        self.links = {}
+        for (r, c), node in self.nodes.items():
+            for d, (dr, dc) in APPROACH_STEP.items():
+                dst = self.nodes.get((r + dr, c + dc))
+                if dst is not None:
+                    self.links[(r, c, d)] = Link(node, dst, link_time)
+        self.link_list = list(self.links.values())
+        self.node_list = list(self.nodes.values())
+
+        self.sim_time = 0.0
+        self.steps = 0
+        self.exited = 0        # Vehicles that left the whole network
+        self.exit_waits = []   # Total wait of each of them, over all junctions
+        self.handed_off = 0    # Vehicles passed to on_leave
+        self.inbound = []      # Heap of (arrival time, seq, vehicle, node) from other partitions
+        self._inbound_seq = itertools.count()
+
+    def _route(self, pos, vehicle):
+        r, c = pos
+        link = self.links.get((r, c, vehicle.approach))
+        if link is not None:
+            link.push(vehicle, self.clock.now)
+            return
+        dr, dc = APPROACH_STEP[vehicle.approach]
+        target = (r + dr, c + dc)
+        if self.on_leave is not None and 0 <= target[0] < self.shape[0] and 0 <= target[1] < self.shape[1]:
+            self.handed_off += 1
+            self.on_leave(vehicle, target)
+        else:
+            self.exited += 1
+            self.exit_waits.append(vehicle.wait_time)
+
+    def receive(self, vehicle, pos, at=None):
+        """Vehicle arriving from outside this partition at node pos, at simulated time `at` (now if None)."""
+        if at is None:
+            self.nodes[pos].vehicle_manager.receive(vehicle)
+        else:
+            heapq.heappush(self.inbound, (at, next(self._inbound_seq), vehicle, pos))
+
+    def step(self):
+        self.clock.advance(self.dt)
+        now = self.clock.now
+        for link in self.link_list:
+            link.deliver(now)
+        inbound = self.inbound
+        while inbound and inbound[0][0] <= now:
+            _, _, vehicle, pos = heapq.heappop(inbound)
+            self.nodes[pos].vehicle_manager.receive(vehicle)
+        dt = self.dt
+        for node in self.node_list:
+            node.update(dt)
+        self.steps += 1
+        self.sim_time = self.steps * self.dt
+
+    def run(self, seconds):
+        n_steps = int(round(seconds / self.dt))
+        for _ in range(n_steps):
+            self.step()
+        return n_steps
+
+    def vehicle_count(self):
+        on_roads = sum(len(lane) for node in self.node_list
+                       for lane in node.vehicle_manager.vehicles.values())
+        waiting = sum(len(node.vehicle_manager.arrivals) for node in self.node_list)
+        in_transit = sum(len(link.in_transit) for link in self.link_list) + len(self.inbound)
+        return on_roads + waiting + in_transit
+
+    def summary(self):
+        waits = self.exit_waits
+        return {
+            "grid": f"{self.rows}x{self.cols}",
+            "sim_time": self.sim_time,
+            "steps": self.steps,
+            "spawned": sum(node.vehicle_manager.next_id for node in self.node_list),
+            "vehicles": self.vehicle_count(),
+            "exited": self.exited,
+            "mean_wait": sum(waits) / len(waits) if waits else 0.0,
+            "max_queue": max(node.vehicle_manager.get_lane_info(d)[0]
+                             for node in self.node_list for d in ("N", "S", "E", "W")),
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a grid of intersections without a display.")
+    parser.add_argument("--rows", type=int, default=5)
+    parser.add_argument("--cols", type=int, default=5)
+    parser.add_argument("--minutes", type=float, default=10.0, help="simulated minutes to run")
+    parser.add_argument("--dt", type=float, default=0.1, help="fixed timestep in seconds")
+    parser.add_argument("--link-time", type=float, default=1.0, help="seconds between neighbouring junctions")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    network = RoadNetwork(args.rows, args.cols, dt=args.dt, seed=args.seed, link_time=args.link_time)
+    wall_start = time.perf_counter()
+    network.run(args.minutes * 60.0)
+    wall = time.perf_counter() - wall_start
+
+    for key, value in network.summary().items():
+        print(f"{key}: {value}")
+    print(f"wall_time: {wall:.2f}s ({network.sim_time / wall:.1f}x real time)")
@@ -0,0 +1,243 @@
+# parallel_network.py
+
+import argparse
+import bisect
+import multiprocessing
+import queue
+import struct
+import time
+from multiprocessing import shared_memory
+
+from network import RoadNetwork
+from sim_clock import fresh_seed
+from vehicle import Vehicle
+
+# One vehicle crossing a partition boundary:
+# id, target row, target col, approach, ambulance, type, color, speed, wait, stops, arrival time
+RECORD = struct.Struct("<qii1s?12s12sddHd")
+COUNT = struct.Struct("<q")
+
+
+def pack_vehicle(buf, offset, vehicle, pos, at):
+    RECORD.pack_into(buf, offset, vehicle.id, pos[0], pos[1], vehicle.approach.encode(),
+                     vehicle.is_ambulance, vehicle.type_name.encode(),
+                     (vehicle.color_name or "").encode(),
+                     vehicle.speed, vehicle.wait_time, vehicle.stops, at)
+
+
+def unpack_vehicle(buf, offset, road_info, now):
+    (vid, row, col, approach, is_ambulance, type_name, color_name,
+     speed, wait, stops, at) = RECORD.unpack_from(buf, offset)
+    color_name = color_name.rstrip(b"\0").decode() or None
+    vehicle = Vehicle(vid, approach.decode(), road_info, is_ambulance, spawn_time=now,
+                      type_name=type_name.rstrip(b"\0").decode(), color_name=color_name)
+    vehicle.speed = speed
+    vehicle.wait_time = wait
+    vehicle.stops = stops
+    return vehicle, (row, col), at
+
+
+class Mailbox:
+    """Shared-memory buffer for vehicles going from one partition to another.
+
+    Two slots, used on alternate exchanges, so a writer can fill the next
+    slot while its neighbour may still be reading the previous one; one
+    barrier per exchange is then enough. Each slot is a record count
+    followed by up to `capacity` packed RECORDs.
+    """
+
+    def __init__(self, capacity, name=None):
+        self.capacity = capacity
+        self.slot_size = COUNT.size + capacity * RECORD.size
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=2 * self.slot_size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+
+    def write(self, slot, records):
+        """Store as many (vehicle, pos, at) as fit; returns the ones that did not."""
+        buf = self.shm.buf
+        base = slot * self.slot_size
+        n = min(len(records), self.capacity)
+        for i in range(n):
+            pack_vehicle(buf, base + COUNT.size + i * RECORD.size, *records[i])
+        COUNT.pack_into(buf, base, n)
+        return records[n:]
+
+    def read(self, slot, road_info, now):
+        buf = self.shm.buf
+        base = slot * self.slot_size
+        (n,) = COUNT.unpack_from(buf, base)
+        return [unpack_vehicle(buf, base + COUNT.size + i * RECORD.size, road_info, now)
+                for i in range(n)]
+
+    def close(self):
+        self.shm.close()
+
+
+def split_rows(rows, parts):
+    """First row of each of `parts` horizontal stripes, as even as possible."""
+    parts = max(1, min(parts, rows))
+    return [i * rows // parts for i in range(parts)]
+
+
+def _run_partition(index, starts, shape, network_kwargs, steps, sync_every,
+                   barrier, mailbox_names, capacity, results):
+    """Worker: step one stripe of the grid, swapping boundary vehicles every sync_every steps."""
+    total_rows, cols = shape
+    first_row = starts[index]
+    end_row = starts[index + 1] if index + 1 < len(starts) else total_rows
+
+    # Neighbour partition -> vehicles (vehicle, pos, arrival time) waiting to be sent
+    outgoing = {j: [] for j in (index - 1, index + 1) if 0 <= j < len(starts)}
+    network = None
+
+    def on_leave(vehicle, pos):
+        dst = bisect.bisect_right(starts, pos[0]) - 1
+        outgoing[dst].append((vehicle, pos, network.clock.now + network_kwargs.get("link_time", 1.0)))
+
+    network = RoadNetwork(end_row - first_row, cols, origin=(first_row, 0), shape=shape,
+                          on_leave=on_leave, **network_kwargs)
+    road_info = network.layout["road_info"]
+    send = {j: Mailbox(capacity, mailbox_names[(index, j)]) for j in outgoing}
+    recv = {j: Mailbox(capacity, mailbox_names[(j, index)]) for j in outgoing}
+
+    done = 0
+    exchange = 0
+    busy = 0.0
+    while done < steps:
+        start = time.perf_counter()
+        for _ in range(min(sync_every, steps - done)):
+            network.step()
+            done += 1
+
+        slot = exchange % 2
+        for j, mailbox in send.items():
+            outgoing[j] = mailbox.write(slot, outgoing[j])  # Overflow goes next time
+        busy += time.perf_counter() - start
+
+        barrier.wait()
+
+        start = time.perf_counter()
+        now = network.clock.now
+        for mailbox in recv.values():
+            for vehicle, pos, at in mailbox.read(slot, road_info, now):
+                network.receive(vehicle, pos, at)
+        exchange += 1
+        busy += time.perf_counter() - start
+
+    for mailbox in list(send.values()) + list(recv.values()):
+        mailbox.close()
+
+    summary = network.summary()
+    results.put({
+        "index": index,
+        "rows": end_row - first_row,
+        "steps": network.steps,
+        "sim_time": network.sim_time,
+        "spawned": summary["spawned"],
+        "vehicles": network.vehicle_count() + sum(len(v) for v in outgoing.values()),
+        "exited": network.exited,
+        "wait_sum": sum(network.exit_waits),
+        "max_queue": summary["max_queue"],
+        "busy": busy,
+    })
+
+
+def _collect(procs, results, barrier, poll=0.5):
+    """One result per worker. If a worker dies first, break the barrier and raise."""
+    parts_results = []
+    while len(parts_results) < len(procs):
+        try:
+            parts_results.append(results.get(timeout=poll))
+            continue
+        except queue.Empty:
+            pass
+        dead = [(i, p.exitcode) for i, p in enumerate(procs) if p.exitcode not in (None, 0)]
+        if dead:
+            # Its neighbours would wait at the barrier forever; release them and stop the rest
+            barrier.abort()
+            for p in procs:
+                p.terminate()
+                p.join()
+            failed = ", ".join(f"{i} (exit code {code})" for i, code in dead)
+            raise RuntimeError(f"Partition worker {failed} died; run stopped")
+    return parts_results
+
+
+def run_parallel(rows, cols, workers, seconds, dt=0.1, seed=None, link_time=1.0,
+                 spawn_interval=(1.2, 3.0), capacity=4096):
+    """Run a rows x cols RoadNetwork split into row stripes, one process per stripe.
+
+    Stripes advance in lock-step windows of sync_every = link_time / dt
+    steps: a vehicle crossing into another stripe needs at least link_time
+    to arrive, so exchanging boundary vehicles once per window never
+    delivers one late. Vehicles travel between processes as packed records
+    in shared memory, never pickled.
+    """
+    starts = split_rows(rows, workers)
+    parts = len(starts)
+    steps = int(round(seconds / dt))
+    sync_every = max(1, int(link_time / dt + 1e-9))
+    if seed is None:
+        seed = fresh_seed()  # One seed for every partition, so they make one consistent grid
+    network_kwargs = {"dt": dt, "seed": seed, "link_time": link_time, "spawn_interval": spawn_interval}
+
+    mailboxes = {}
+    for i in range(parts - 1):
+        for key in ((i, i + 1), (i + 1, i)):
+            mailboxes[key] = Mailbox(capacity)
+    names = {key: m.name for key, m in mailboxes.items()}
+
+    barrier = multiprocessing.Barrier(parts)
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=_run_partition,
+                                     args=(i, starts, (rows, cols), network_kwargs, steps, sync_every,
+                                           barrier, names, capacity, results))
+             for i in range(parts)]
+    try:
+        for p in procs:
+            p.start()
+        parts_results = _collect(procs, results, barrier)
+        for p in procs:
+            p.join()
+    finally:
+        for m in mailboxes.values():
+            m.close()
+            m.shm.unlink()
+
+    exited = sum(r["exited"] for r in parts_results)
+    return {
+        "grid": f"{rows}x{cols}",
+        "workers": parts,
+        "sim_time": parts_results[0]["sim_time"],
+        "steps": steps,
+        "spawned": sum(r["spawned"] for r in parts_results),
+        "vehicles": sum(r["vehicles"] for r in parts_results),
+        "exited": exited,
+        "mean_wait": sum(r["wait_sum"] for r in parts_results) / exited if exited else 0.0,
+        "max_queue": max(r["max_queue"] for r in parts_results),
+        "busy": [round(r["busy"], 2) for r in sorted(parts_results, key=lambda r: r["index"])],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a grid of intersections on several processes.")
+    parser.add_argument("--rows", type=int, default=20)
+    parser.add_argument("--cols", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--minutes", type=float, default=5.0, help="simulated minutes to run")
+    parser.add_argument("--dt", type=float, default=0.1, help="fixed timestep in seconds")
+    parser.add_argument("--link-time", type=float, default=1.0, help="seconds between neighbouring junctions")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    wall_start = time.perf_counter()
+    summary = run_parallel(args.rows, args.cols, args.workers, args.minutes * 60.0,
+                           dt=args.dt, seed=args.seed, link_time=args.link_time)
+    wall = time.perf_counter() - wall_start
+
+    for key, value in summary.items():
+        print(f"{key}: {value}")
+    print(f"wall_time: {wall:.2f}s ({summary['sim_time'] / wall:.1f}x real time)")
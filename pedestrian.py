@@ -1,6 +1,5 @@
 # pedestrian.py
 
-import pygame
 import random
 
 class Pedestrian:
@@ -52,8 +51,6 @@ class Pedestrian:
             self.x += nx * self.speed * dt
             self.y += ny * self.speed * dt
 
-    def draw(self, surface):
-        pygame.draw.circle(surface, self.color, (int(self.x), int(self.y)), self.radius)
 
 
 class PedestrianManager:
@@ -71,7 +68,3 @@ class PedestrianManager:
 
     def update(self, dt, light_states):
         pass # To be implemented once geometry is passed
-
-    def draw(self, surface):
-        for p in self.pedestrians:
-            p.draw(surface)
@@ -0,0 +1,203 @@
+# petri_io.py
+
+import argparse
+import json
+import math
+import xml.etree.ElementTree as ET
+
+# Plain place/transition nets (PNML 2009 grammar); transition timing is kept
+# in a toolspecific element so other PNML tools can still read the structure.
+PNML_NS = "http://www.pnml.org/version-2009/grammar/pnml"
+PNML_PTNET = "http://www.pnml.org/version-2009/grammar/ptnet"
+TOOL = "traffic-petri"
+FORMAT_VERSION = 1
+
+
+def net_to_dict(net):
+    """Definition of a net (any backend) as plain data: places in order, transitions in priority order.
+
+    Uses the current token counts and min_times as the initial marking and
+    timings. max_time is left out when infinite.
+    """
+    transitions = []
+    for t in sorted(net.transitions, key=lambda t: t.index):
+        entry = {
+            "name": t.name,
+            "min_time": t.min_time,
+            "inputs": {p.name: w for p, w in t.inputs.items()},
+            "outputs": {p.name: w for p, w in t.outputs.items()},
+        }
+        if t.max_time != math.inf:
+            entry["max_time"] = t.max_time
+        transitions.append(entry)
+    places = []
+    for p in net.places.values():
+        places.append({"name": p.name, "tokens": p.tokens})
+        if getattr(p, "timed", False):
+            places[-1]["timed"] = True
+    return {
+        "version": FORMAT_VERSION,
+        "places": places,
+        "transitions": transitions,
+    }
+
+
+def net_from_dict(data, net_cls=None):
+    """Build a net of net_cls (PetriNet by default) from a net_to_dict() definition."""
+    if net_cls is None:
+        from petri_net import PetriNet
+        net_cls = PetriNet
+    if data.get("version", FORMAT_VERSION) != FORMAT_VERSION:
+        raise ValueError(f"Unsupported net definition version: {data['version']}")
+    net = net_cls()
+    for p in data["places"]:
+        net.add_place(p["name"], p.get("tokens", 0), timed=p.get("timed", False))
+    for entry in data["transitions"]:
+        t = net.add_transition(entry["name"], min_time=entry.get("min_time", 0),
+                               max_time=entry.get("max_time", math.inf))
+        for name, w in entry.get("inputs", {}).items():
+            t.add_input(_place(net, name, entry["name"]), w)
+        for name, w in entry.get("outputs", {}).items():
+            t.add_output(_place(net, name, entry["name"]), w)
+    return net
+
+
+def _place(net, name, transition):
+    try:
+        return net.places[name]
+    except KeyError:
+        raise ValueError(f"Transition {transition} refers to unknown place {name}") from None
+
+
+def dict_to_pnml(data, net_id="net"):
+    root = ET.Element("pnml", xmlns=PNML_NS)
+    page = ET.SubElement(ET.SubElement(root, "net", id=net_id, type=PNML_PTNET), "page", id="page0")
+    for p in data["places"]:
+        place = ET.SubElement(page, "place", id=p["name"])
+        ET.SubElement(ET.SubElement(place, "name"), "text").text = p["name"]
+        if p.get("tokens"):
+            ET.SubElement(ET.SubElement(place, "initialMarking"), "text").text = str(p["tokens"])
+        if p.get("timed"):
+            # Per-token arrival times (petri_net.Place timed=True)
+            ET.SubElement(ET.SubElement(place, "toolspecific", tool=TOOL, version=str(FORMAT_VERSION)), "queue")
+    arcs = []
+    for entry in data["transitions"]:
+        name = entry["name"]
+        transition = ET.SubElement(page, "transition", id=name)
+        ET.SubElement(ET.SubElement(transition, "name"), "text").text = name
+        timing = {"min": repr(float(entry.get("min_time", 0)))}
+        if "max_time" in entry:
+            timing["max"] = repr(float(entry["max_time"]))
+        tool = ET.SubElement(transition, "toolspecific", tool=TOOL, version=str(FORMAT_VERSION))
+        ET.SubElement(tool, "timing", timing)
+        arcs += [(p, name, w) for p, w in entry.get("inputs", {}).items()]
+        arcs += [(name, p, w) for p, w in entry.get("outputs", {}).items()]
+    for i, (source, target, w) in enumerate(arcs):
+        arc = ET.SubElement(page, "arc", id=f"a{i}", source=source, target=target)
+        if w != 1:
+            ET.SubElement(ET.SubElement(arc, "inscription"), "text").text = str(w)
+    ET.indent(root)
+    return ET.tostring(root, encoding="unicode", xml_declaration=True)
+
+
+def pnml_to_dict(text):
+    """Read the first net of a PNML document; pages are flattened, unknown tool data ignored."""
+    root = ET.fromstring(text)
+
+    def local(tag):
+        return tag.rsplit("}", 1)[-1]
+
+    def find(elem, *path):
+        for step in path:
+            elem = next((c for c in elem if local(c.tag) == step), None)
+            if elem is None:
+                return None
+        return elem
+
+    net = next((e for e in root.iter() if local(e.tag) == "net"), None)
+    if net is None:
+        raise ValueError("PNML document has no net")
+
+    names = {}  # PNML id -> name
+    places, transitions, arcs = [], [], []
+    for elem in net.iter():
+        kind = local(elem.tag)
+        if kind not in ("place", "transition", "arc"):
+            continue
+        if kind == "arc":
+            inscription = find(elem, "inscription", "text")
+            arcs.append((elem.get("source"), elem.get("target"),
+                         int(inscription.text) if inscription is not None else 1))
+            continue
+        label = find(elem, "name", "text")
+        names[elem.get("id")] = label.text.strip() if label is not None else elem.get("id")
+        if kind == "place":
+            marking = find(elem, "initialMarking", "text")
+            places.append({"name": names[elem.get("id")],
+                           "tokens": int(marking.text) if marking is not None else 0})
+            if any(local(e.tag) == "queue" for e in elem.iter()):
+                places[-1]["timed"] = True
+        else:
+            entry = {"name": names[elem.get("id")], "min_time": 0, "inputs": {}, "outputs": {}}
+            timing = next((e for e in elem.iter() if local(e.tag) == "timing"), None)
+            if timing is not None:
+                entry["min_time"] = float(timing.get("min", 0))
+                if timing.get("max") not in (None, "inf"):
+                    entry["max_time"] = float(timing.get("max"))
+            transitions.append(entry)
+
+    by_name = {t["name"]: t for t in transitions}
+    place_names = {p["name"] for p in places}
+    for source, target, w in arcs:
+        source, target = names.get(source, source), names.get(target, target)
+        if source in place_names and target in by_name:
+            by_name[target]["inputs"][source] = w
+        elif source in by_name and target in place_names:
+            by_name[source]["outputs"][target] = w
+        else:
+            raise ValueError(f"Arc {source} -> {target} does not join a place and a transition")
+    return {"version": FORMAT_VERSION, "places": places, "transitions": transitions}
+
+
+def read_definition(path):
+    with open(path) as f:
+        text = f.read()
+    if path.endswith(".pnml") or path.endswith(".xml"):
+        return pnml_to_dict(text)
+    return json.loads(text)
+
+
+def write_definition(data, path):
+    with open(path, "w") as f:
+        if path.endswith(".pnml") or path.endswith(".xml"):
+            f.write(dict_to_pnml(data))
+        else:
+            json.dump(data, f, indent=2)
+            f.write("\n")
+
+
+def load_net(path, net_cls=None):
+    """Net from a .json or .pnml file."""
+    return net_from_dict(read_definition(path), net_cls)
+
+
+def save_net(net, path):
+    """Write net to path; the extension (.json or .pnml) picks the format."""
+    write_definition(net_to_dict(net), path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert Petri net definitions, or export the built-in controller net.")
+    parser.add_argument("output", help="file to write (.json or .pnml)")
+    parser.add_argument("--input", help="net file to convert (default: the AdaptiveController net)")
+    args = parser.parse_args()
+
+    if args.input:
+        data = read_definition(args.input)
+    else:
+        from adaptive_controller import AdaptiveController
+        from layout import build_layout
+        layout = build_layout()
+        data = net_to_dict(AdaptiveController(layout["poles"], layout["approach_map"]).net)
+    write_definition(data, args.output)
+    print(f"{args.output}: {len(data['places'])} places, {len(data['transitions'])} transitions")
@@ -1,24 +1,123 @@
 # petri_net.py
 
+import heapq
 import time
+from collections import deque
+
+# advance_to() gives up after this many firings without time moving on
+MAX_FIRINGS_PER_INSTANT = 10000
+
+
+class ZenoError(RuntimeError):
+    """Transitions keep firing at one instant (e.g. a cycle with min_time 0)."""
+
+
+def check_progress(fire_time, instant, count, transition_name):
+    """Count one firing at fire_time, given `count` firings so far at `instant`; returns the new count.
+
+    Used by every backend's advance_to(); raises ZenoError past the limit.
+    """
+    if fire_time != instant:
+        return 1
+    if count >= MAX_FIRINGS_PER_INSTANT:
+        raise ZenoError(f"{count} firings at t={fire_time} without time advancing "
+                        f"(last: {transition_name}); does a cycle have min_time 0?")
+    return count + 1
+
 
 class Place:
-    def __init__(self, name, tokens=0, current_time=0):
+    def __init__(self, name, tokens=0, current_time=0, timed=False):
         self.name = name
-        self.tokens = tokens
+        self.net = None        # Set by PetriNet.add_place
+        self.dependents = []   # Transitions that consume from this place
+        self._tokens = tokens
         self.last_arrival_time = current_time
+        # Timed places keep every token as (arrival time, data), oldest first,
+        # and always consume the oldest ones. Untimed places share one
+        # last_arrival_time, so a new token restarts the clock for all of them.
+        self.queue = deque([(current_time, None)] * tokens) if timed else None
 
-    def add_token(self, count=1, current_time=0):
-        self.tokens += count
+    @property
+    def timed(self):
+        return self.queue is not None
+
+    @property
+    def tokens(self):
+        return self._tokens
+
+    @tokens.setter
+    def tokens(self, value):
+        # Every write (including direct `tokens =` from controllers) refreshes
+        # the enabled set of the transitions reading this place.
+        queue = self.queue
+        if queue is not None and len(queue) != value:
+            # Direct writes drop the oldest tokens or add data-less ones stamped now
+            while len(queue) > value:
+                queue.popleft()
+            if len(queue) < value:
+                now = self.net.current_time if self.net is not None else self.last_arrival_time
+                queue.extend([(now, None)] * (value - len(queue)))
+                self.last_arrival_time = now
+        self._tokens = value
+        if self.net is not None:
+            self.net._tokens_changed(self)
+
+    def add_token(self, count=1, current_time=0, data=None):
+        """Add count tokens; on a timed place each carries `data` (e.g. a vehicle id)."""
+        # Stamp the arrival first so the token write reschedules with the new time
         if count > 0:
             self.last_arrival_time = current_time
+            if self.queue is not None:
+                self.queue.extend([(current_time, data)] * count)
+        self.tokens += count
 
     def remove_token(self, count=1):
         if self.tokens >= count:
+            if self.queue is not None:
+                for _ in range(count):
+                    self.queue.popleft()
             self.tokens -= count
             return True
         return False
 
+    def take(self, count=1):
+        """Remove the count oldest tokens and return their data (Nones for an untimed place)."""
+        if self._tokens < count:
+            return []
+        if self.queue is None:
+            self.tokens -= count
+            return [None] * count
+        popleft = self.queue.popleft
+        data = [popleft()[1] for _ in range(count)]
+        self.tokens -= count
+        return data
+
+    def put(self, count, current_time, data=()):
+        """Add count tokens carrying the given data in order (None where it runs out)."""
+        if count <= 0:
+            return
+        self.last_arrival_time = current_time
+        if self.queue is not None:
+            queue = self.queue
+            for i in range(count):
+                queue.append((current_time, data[i] if i < len(data) else None))
+        self.tokens += count
+
+    def ready_time(self, weight=1):
+        """Arrival time of the youngest of the `weight` tokens a transition would consume.
+
+        O(weight) on a timed place, however many tokens it holds.
+        """
+        if self.queue is None:
+            return self.last_arrival_time
+        return self.queue[weight - 1][0]
+
+    def peek(self, count=1):
+        """Data of the count oldest tokens, without removing them."""
+        if self.queue is None:
+            return [None] * min(count, self._tokens)
+        return [self.queue[i][1] for i in range(min(count, len(self.queue)))]
+
     def __repr__(self):
         return f"Place({self.name}, tokens={self.tokens})"
 
@@ -26,27 +125,53 @@ class Place:
 class Transition:
     def __init__(self, name, min_time=0, max_time=float('inf')):
         self.name = name
+        self.net = None   # Set by PetriNet.add_transition
+        self.index = 0    # Insertion order, used as firing priority
         self.min_time = min_time  # Minimum duration tokens must stay in input places
         self.max_time = max_time  
         self.inputs = {}  # Map Place -> token count needed
         self.outputs = {} # Map Place -> token count produced
         self.last_fired_time = 0
+        # Next-event bookkeeping (see PetriNet.next_event_time)
+        self.scheduled_time = None
+        self.version = 0
+
+    @property
+    def min_time(self):
+        return self._min_time
+
+    @min_time.setter
+    def min_time(self, value):
+        # Controllers retune min_time at runtime; keep the event heap in sync
+        self._min_time = value
+        if self.net is not None:
+            self.net._refresh(self)
 
     def add_input(self, place, weight=1):
         self.inputs[place] = weight
+        if self not in place.dependents:
+            place.dependents.append(self)
+        if self.net is not None:
+            self.net._refresh(self)
 
     def add_output(self, place, weight=1):
         self.outputs[place] = weight
 
+    def earliest_fire_time(self):
+        """When the youngest token to be consumed will be min_time old (tokens assumed present)."""
+        if not self.inputs:
+            return None
+        return max(p.ready_time(w) for p, w in self.inputs.items()) + self.min_time
+
     def can_fire(self, current_time=None, ignore_time=False):
         # Check token requirements and timing
         for place, weight in self.inputs.items():
             if place.tokens < weight:
                 return False
             
-            # Check timing relative to token arrival
+            # Check timing relative to token arrival (oldest tokens on timed places)
             if not ignore_time and current_time is not None:
-                duration = current_time - place.last_arrival_time
+                duration = current_time - place.ready_time(weight)
                 if duration < self.min_time:
                     return False
         
@@ -56,13 +181,20 @@ class Transition:
          # Note: We don't check can_fire here again to allow 'force' logic if caller checked.
          # But usually caller checks.
         
-        # Consume tokens
+        # Consume tokens, oldest first; their data moves on to timed outputs in order
+        consumed = []
         for place, weight in self.inputs.items():
-            place.remove_token(weight)
+            if place.queue is None:
+                place.remove_token(weight)
+            else:
+                consumed += place.take(weight)
 
         # Produce tokens
         for place, weight in self.outputs.items():
-            place.add_token(weight, current_time)
+            if place.queue is None:
+                place.add_token(weight, current_time)
+            else:
+                place.put(weight, current_time, consumed)
         
         if current_time is not None:
             self.last_fired_time = current_time
@@ -78,23 +210,69 @@ class PetriNet:
         self.places = {}
         self.transitions = []
         self.current_time = 0
+        # Transitions whose input places hold enough tokens (timing not checked).
+        # Maintained incrementally from Place token writes.
+        self._enabled = set()
+        # Min-heap of (fire_time, index, version, transition) for the enabled
+        # transitions; entries whose version is outdated are skipped lazily.
+        self._events = []
 
-    def add_place(self, name, tokens=0):
-        p = Place(name, tokens, self.current_time)
+    def add_place(self, name, tokens=0, timed=False):
+        """timed: keep per-token arrival times and data (see Place)."""
+        p = Place(name, tokens, self.current_time, timed)
+        p.net = self
         self.places[name] = p
         return p
 
     def add_transition(self, name, min_time=0, max_time=float('inf')):
         t = Transition(name, min_time, max_time)
+        t.net = self
+        t.index = len(self.transitions)
         self.transitions.append(t)
+        self._refresh(t)
         return t
 
+    def _refresh(self, t):
+        if t.can_fire(ignore_time=True):
+            self._enabled.add(t)
+            fire_time = t.earliest_fire_time()
+        else:
+            self._enabled.discard(t)
+            fire_time = None
+
+        if fire_time != t.scheduled_time:
+            t.version += 1
+            t.scheduled_time = fire_time
+            if fire_time is not None:
+                self._push_event(t)
+
+    def _push_event(self, t):
+        # Polling-only runs never pop the heap, so compact it when stale
+        # entries start to dominate.
+        if len(self._events) > 2 * len(self.transitions) + 16:
+            self._events = [e for e in self._events if e[2] == e[3].version]
+            heapq.heapify(self._events)
+        heapq.heappush(self._events, (t.scheduled_time, t.index, t.version, t))
+
+    def _tokens_changed(self, place):
+        for t in place.dependents:
+            self._refresh(t)
+
+    def enabled_transitions(self, current_time=None):
+        """Token-enabled transitions in priority order.
+
+        With current_time, only those whose min_time has also elapsed.
+        """
+        ordered = sorted(self._enabled, key=lambda t: t.index)
+        if current_time is None:
+            return ordered
+        return [t for t in ordered if t.can_fire(current_time)]
+
     def update(self, dt):
         self.current_time += dt
-        fired_any = False
         
-        # Greedy firing
-        for t in self.transitions:
+        # Greedy firing, only over transitions that already have their tokens
+        for t in sorted(self._enabled, key=lambda t: t.index):
             if t.can_fire(self.current_time):
                 t.fire(self.current_time)
                 # Return immediately to avoid cascading multiple phases in one frame 
@@ -105,15 +283,69 @@ class PetriNet:
                 
         return False
         
+    def next_event_time(self):
+        """Simulated time of the next timed firing, or inf if nothing is pending.
+
+        Transitions without input places are not scheduled: they would be
+        enabled forever and never let time advance.
+        """
+        events = self._events
+        while events and events[0][2] != events[0][3].version:
+            heapq.heappop(events)
+        if not events:
+            return float('inf')
+        return max(events[0][0], self.current_time)
+
+    def advance_to(self, target_time, max_events=None):
+        """Discrete-event replacement for polling update(dt).
+
+        Fires pending transitions in time order (ties by insertion order)
+        at their exact firing time, up to target_time. Returns the number
+        fired. If max_events stops the run early, current_time is left at
+        the last firing so the caller can react before continuing.
+
+        Raises ZenoError after MAX_FIRINGS_PER_INSTANT firings at one
+        instant, which a cycle of zero-min_time transitions would otherwise
+        keep up forever.
+        """
+        fired = 0
+        instant, count = None, 0
+        while max_events is None or fired < max_events:
+            fire_time = self.next_event_time()
+            if fire_time > target_time:
+                break
+            t = heapq.heappop(self._events)[3]
+            t.scheduled_time = None  # Popped; re-pushed by _refresh if still enabled
+            instant, count = fire_time, check_progress(fire_time, instant, count, t.name)
+            self.current_time = fire_time
+            t.fire(fire_time)
+            fired += 1
+        else:
+            # Stopped by max_events: leave the clock at the last firing
+            return fired
+
+        self.current_time = max(self.current_time, target_time)
+        return fired
+
     def force_step(self):
         """Find the first transition that HAS TOKENS (ignoring time) and fire it."""
-        for t in self.transitions:
-            if t.can_fire(self.current_time, ignore_time=True):
-                 t.fire(self.current_time)
-                 return True
+        if self._enabled:
+            t = min(self._enabled, key=lambda t: t.index)
+            t.fire(self.current_time)
+            return True
         return False
 
     def get_token_count(self, place_name):
         if place_name in self.places:
             return self.places[place_name].tokens
         return 0
+
+    @classmethod
+    def load(cls, path):
+        """Net from a .json or .pnml definition (see petri_io)."""
+        from petri_io import load_net
+        return load_net(path, cls)
+
+    def save(self, path):
+        from petri_io import save_net
+        save_net(self, path)
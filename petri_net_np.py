@@ -0,0 +1,286 @@
+# petri_net_np.py
+
+import numpy as np
+
+from petri_net import check_progress
+
+
+class MatrixPlace:
+    """Handle onto one column of a MatrixPetriNet marking.
+
+    Mirrors petri_net.Place so controllers can keep writing `tokens` and
+    calling add_token() without knowing which backend they run on.
+    """
+
+    def __init__(self, net, index, name):
+        self.net = net
+        self.index = index
+        self.name = name
+
+    @property
+    def tokens(self):
+        return int(self.net.marking[self.index])
+
+    @tokens.setter
+    def tokens(self, value):
+        self.net.marking[self.index] = value
+        self.net._place_changed(self.index)
+
+    @property
+    def last_arrival_time(self):
+        return float(self.net.arrival[self.index])
+
+    @last_arrival_time.setter
+    def last_arrival_time(self, value):
+        self.net.arrival[self.index] = value
+        self.net._place_changed(self.index)
+
+    def add_token(self, count=1, current_time=0):
+        self.net.marking[self.index] += count
+        if count > 0:
+            self.net.arrival[self.index] = current_time
+        self.net._place_changed(self.index)
+
+    def remove_token(self, count=1):
+        if self.net.marking[self.index] >= count:
+            self.net.marking[self.index] -= count
+            self.net._place_changed(self.index)
+            return True
+        return False
+
+    def __repr__(self):
+        return f"Place({self.name}, tokens={self.tokens})"
+
+
+class MatrixTransition:
+    """Handle onto one transition of a MatrixPetriNet."""
+
+    def __init__(self, net, index, name, max_time=float('inf')):
+        self.net = net
+        self.index = index
+        self.name = name
+        self.max_time = max_time
+        self.inputs = {}  # Map Place -> token count needed
+        self.outputs = {} # Map Place -> token count produced
+        self.last_fired_time = 0
+
+    @property
+    def min_time(self):
+        return float(self.net.min_time[self.index])
+
+    @min_time.setter
+    def min_time(self, value):
+        self.net.min_time[self.index] = value
+
+    def add_input(self, place, weight=1):
+        self.inputs[place] = weight
+        self.net._dirty = True
+
+    def add_output(self, place, weight=1):
+        self.outputs[place] = weight
+        self.net._dirty = True
+
+    def can_fire(self, current_time=None, ignore_time=False):
+        ignore_time = ignore_time or current_time is None
+        return bool(self.net.enabled(current_time, ignore_time)[self.index])
+
+    def fire(self, current_time=0):
+        self.net.fire(self.index, current_time)
+        return True
+
+    def __repr__(self):
+        return f"Transition({self.name})"
+
+
+class MatrixPetriNet:
+    """PetriNet backend that keeps the marking and arcs in NumPy arrays.
+
+    Same add_place/add_transition/update/force_step/get_token_count API as
+    petri_net.PetriNet. Each transition keeps its input places and weights
+    as small index arrays, and the net caches per transition whether its
+    inputs hold enough tokens (`token_ok`) and when its youngest input
+    token arrived (`youngest`). Firing, or writing a place through its
+    handle, refreshes only the transitions reading the places that
+    changed, with a few array operations. An update is then one
+    comparison over all transitions, O(T), not O(T * P).
+
+    The arc arrays are (re)built lazily the first time the net runs after
+    its structure changed. Write tokens through the places (or fire),
+    not into `marking` directly, or the cache goes stale.
+    """
+
+    def __init__(self):
+        self.places = {}
+        self.transitions = []
+        self.current_time = 0
+
+        self.marking = np.zeros(0, dtype=np.int64)  # tokens per place
+        self.arrival = np.zeros(0, dtype=np.float64)  # last arrival time per place
+        self.min_time = np.zeros(0, dtype=np.float64)  # per transition
+
+        self.token_ok = np.zeros(0, dtype=bool)        # inputs hold enough tokens
+        self.youngest = np.zeros(0, dtype=np.float64)  # latest input arrival (-inf: no inputs)
+        self.has_inputs = np.zeros(0, dtype=bool)
+        self._dirty = False
+
+    def add_place(self, name, tokens=0, timed=False):
+        if timed:
+            raise ValueError("MatrixPetriNet has no per-token timestamps; use petri_net.PetriNet for timed places")
+        p = MatrixPlace(self, len(self.marking), name)
+        self.marking = np.append(self.marking, np.int64(tokens))
+        self.arrival = np.append(self.arrival, np.float64(self.current_time))
+        self.places[name] = p
+        self._dirty = True
+        return p
+
+    def add_transition(self, name, min_time=0, max_time=float('inf')):
+        t = MatrixTransition(self, len(self.transitions), name, max_time)
+        self.min_time = np.append(self.min_time, np.float64(min_time))
+        self.transitions.append(t)
+        self._dirty = True
+        return t
+
+    def compile(self):
+        """Build the per-transition arc arrays and refresh plans from the arc dicts."""
+        def arcs(arc_dict):
+            return (np.array([p.index for p in arc_dict], dtype=np.intp),
+                    np.array(list(arc_dict.values()), dtype=np.int64))
+
+        self.inputs = [arcs(t.inputs) for t in self.transitions]
+        self.outputs = [arcs(t.outputs) for t in self.transitions]
+
+        readers = [[] for _ in self.marking]  # place -> transitions consuming from it
+        for t in self.transitions:
+            for place in t.inputs:
+                readers[place.index].append(t.index)
+        # Transitions to refresh after firing t / after writing place p
+        self._fire_plans = [self._plan({r for p in (*t.inputs, *t.outputs) for r in readers[p.index]})
+                            for t in self.transitions]
+        self._place_plans = [self._plan(set(r)) for r in readers]
+
+        self.has_inputs = np.array([len(t.inputs) > 0 for t in self.transitions], dtype=bool)
+        self.token_ok = np.ones(len(self.transitions), dtype=bool)
+        self.youngest = np.full(len(self.transitions), -np.inf)
+        self._dirty = False
+        self._refresh(self._plan(set(np.flatnonzero(self.has_inputs).tolist())))
+
+    def _plan(self, transitions):
+        """Arrays to recompute token_ok/youngest of `transitions` in one go (all have inputs)."""
+        ts = np.array(sorted(transitions), dtype=np.intp)
+        if not ts.size:
+            return None
+        places = np.concatenate([self.inputs[t][0] for t in ts])
+        weights = np.concatenate([self.inputs[t][1] for t in ts])
+        starts = np.cumsum([0] + [len(self.inputs[t][0]) for t in ts[:-1]])
+        return ts, places, weights, starts
+
+    def _refresh(self, plan):
+        if plan is None:
+            return
+        ts, places, weights, starts = plan
+        self.token_ok[ts] = np.logical_and.reduceat(self.marking[places] >= weights, starts)
+        self.youngest[ts] = np.maximum.reduceat(self.arrival[places], starts)
+
+    def _place_changed(self, index):
+        if not self._dirty:
+            self._refresh(self._place_plans[index])
+
+    def enabled(self, current_time=None, ignore_time=False):
+        """Boolean vector: which transitions may fire right now."""
+        if self._dirty:
+            self.compile()
+        if current_time is None:
+            current_time = self.current_time
+        if ignore_time:
+            return self.token_ok.copy()
+        # Youngest input token must be at least min_time old
+        return self.token_ok & (current_time - self.youngest >= self.min_time)
+
+    def enabled_transitions(self, current_time=None):
+        """Token-enabled transitions in priority order (timed if current_time given)."""
+        mask = self.enabled(current_time, ignore_time=current_time is None)
+        return [self.transitions[i] for i in np.flatnonzero(mask)]
+
+    def fire(self, index, current_time=0):
+        if self._dirty:
+            self.compile()
+        # Like Place.remove_token, an under-supplied input is left untouched
+        places, weights = self.inputs[index]
+        held = self.marking[places]
+        self.marking[places] = held - np.where(held >= weights, weights, 0)
+        places, weights = self.outputs[index]
+        self.marking[places] += weights
+        self.arrival[places[weights > 0]] = current_time
+        self._refresh(self._fire_plans[index])
+        if current_time is not None:
+            self.transitions[index].last_fired_time = current_time
+
+    def update(self, dt):
+        self.current_time += dt
+        # Greedy firing: first enabled transition in insertion order, one per frame
+        ready = self.enabled(self.current_time)
+        if ready.size:
+            index = int(ready.argmax())
+            if ready[index]:
+                self.fire(index, self.current_time)
+                return True
+        return False
+
+    def fire_times(self):
+        """Earliest firing time per transition (inf where tokens are missing)."""
+        if self._dirty:
+            self.compile()
+        return np.where(self.token_ok & self.has_inputs, self.youngest + self.min_time, np.inf)
+
+    def next_event_time(self):
+        """Simulated time of the next timed firing, or inf if nothing is pending."""
+        times = self.fire_times()
+        if not times.size:
+            return float('inf')
+        return max(float(times.min()), self.current_time)
+
+    def advance_to(self, target_time, max_events=None):
+        """Fire pending transitions in time order up to target_time (see PetriNet.advance_to)."""
+        fired = 0
+        instant, count = None, 0
+        while max_events is None or fired < max_events:
+            times = self.fire_times()
+            if not times.size:
+                break
+            index = int(np.argmin(times))  # ties resolve to insertion order
+            fire_time = max(float(times[index]), self.current_time)
+            if fire_time > target_time:
+                break
+            instant, count = fire_time, check_progress(fire_time, instant, count, self.transitions[index].name)
+            self.current_time = fire_time
+            self.fire(index, fire_time)
+            fired += 1
+        else:
+            # Stopped by max_events: leave the clock at the last firing
+            return fired
+
+        self.current_time = max(self.current_time, target_time)
+        return fired
+
+    def force_step(self):
+        """Find the first transition that HAS TOKENS (ignoring time) and fire it."""
+        candidates = np.flatnonzero(self.enabled(ignore_time=True))
+        if candidates.size:
+            self.fire(candidates[0], self.current_time)
+            return True
+        return False
+
+    def get_token_count(self, place_name):
+        if place_name in self.places:
+            return self.places[place_name].tokens
+        return 0
+
+    @classmethod
+    def load(cls, path):
+        """Net from a .json or .pnml definition (see petri_io)."""
+        from petri_io import load_net
+        return load_net(path, cls)
+
+    def save(self, path):
+        from petri_io import save_net
+        save_net(self, path)
@@ -0,0 +1,140 @@
+# profiling.py
+
+import cProfile
+import os
+import time
+from collections import deque
+
+import pygame
+
+
+class FrameProfiler:
+    """Per-phase frame timing with rolling percentiles, plus on-demand cProfile captures.
+
+    The loop calls begin_frame() once, then lap(name) after each phase; a
+    lap is charged the time since the previous lap, so phases that run
+    several times in one frame (simulation substeps) add up. end_frame()
+    files the frame's totals into a rolling window per phase.
+
+        profiler.begin_frame()
+        handle_events();   profiler.lap("events")
+        engine.step();     # engine laps "update" and "metrics" itself
+        renderer.begin_frame(); profiler.lap("background")
+        ...
+        profiler.end_frame()
+    """
+
+    def __init__(self, window=240, refresh_frames=30, capture_dir="profiles"):
+        self.window = window                  # Frames kept per phase
+        self.refresh_frames = refresh_frames  # Overlay numbers are recomputed this often
+        self.capture_dir = capture_dir
+        self.samples = {}      # phase -> deque of ms, in first-seen order
+        self.frame_ms = deque(maxlen=window)
+        self.visible = False
+        self.frames = 0
+        self.stats_lines = []
+
+        self._totals = {}
+        self._frame_start = 0.0
+        self._last = 0.0
+
+        self.capture = None            # Running cProfile.Profile
+        self.capture_frames_left = 0
+        self.capture_path = None
+        self.last_capture = None       # Path of the last finished capture
+
+    def begin_frame(self):
+        self._frame_start = self._last = time.perf_counter()
+        self._totals = {}
+
+    def lap(self, name):
+        now = time.perf_counter()
+        self._totals[name] = self._totals.get(name, 0.0) + (now - self._last)
+        self._last = now
+
+    def end_frame(self):
+        end = time.perf_counter()
+        for name, seconds in self._totals.items():
+            window = self.samples.get(name)
+            if window is None:
+                window = self.samples[name] = deque(maxlen=self.window)
+            window.append(seconds * 1000.0)
+        self.frame_ms.append((end - self._frame_start) * 1000.0)
+
+        self.frames += 1
+        if self.frames % self.refresh_frames == 0:
+            self.stats_lines = self._format_stats()
+
+        if self.capture is not None:
+            self.capture_frames_left -= 1
+            if self.capture_frames_left <= 0:
+                self.stop_capture()
+
+    # --- Statistics ---
+    @staticmethod
+    def percentile(sorted_values, q):
+        if not sorted_values:
+            return 0.0
+        i = min(int(q * len(sorted_values)), len(sorted_values) - 1)
+        return sorted_values[i]
+
+    def stats(self):
+        """phase -> (p50, p95, max) in ms over the window; "frame" is the whole frame."""
+        result = {}
+        for name, window in [("frame", self.frame_ms)] + list(self.samples.items()):
+            values = sorted(window)
+            result[name] = (self.percentile(values, 0.50), self.percentile(values, 0.95),
+                            values[-1] if values else 0.0)
+        return result
+
+    def _format_stats(self):
+        lines = [f"{'ms':<11}{'p50':>6}{'p95':>6}{'max':>6}"]
+        for name, (p50, p95, peak) in self.stats().items():
+            lines.append(f"{name:<11}{p50:>6.2f}{p95:>6.2f}{peak:>6.1f}")
+        if self.capture is not None:
+            lines.append(f"profiling... {self.capture_frames_left}")
+        elif self.last_capture:
+            lines.append(f"saved {os.path.basename(self.last_capture)}")
+        return lines
+
+    # --- cProfile capture ---
+    def start_capture(self, frames=300, path=None):
+        """Profile the next `frames` frames and dump the stats (pstats format) to path."""
+        if self.capture is not None:
+            return
+        if path is None:
+            os.makedirs(self.capture_dir, exist_ok=True)
+            path = os.path.join(self.capture_dir, time.strftime("frame-%Y%m%d-%H%M%S.prof"))
+        self.capture_path = path
+        self.capture_frames_left = frames
+        self.capture = cProfile.Profile()
+        self.capture.enable()
+
+    def stop_capture(self):
+        if self.capture is None:
+            return None
+        self.capture.disable()
+        self.capture.dump_stats(self.capture_path)
+        self.capture = None
+        self.last_capture = self.capture_path
+        return self.last_capture
+
+    # --- Overlay ---
+    def overlay_key(self):
+        """Changes only when the overlay would look different (for Renderer.overlay)."""
+        return (self.visible, tuple(self.stats_lines)) if self.visible else None
+
+    def draw(self, surface, font, x=240, y=80):
+        """Draw the timing panel next to the Metrics panel. Returns its rect."""
+        if not self.visible:
+            return pygame.Rect(x, y, 0, 0)
+        lines = self.stats_lines or ["collecting..."]
+        bg_rect = pygame.Rect(x, y, 230, 20 + 22 * len(lines))
+        pygame.draw.rect(surface, (0, 0, 0), bg_rect, border_radius=8)
+        pygame.draw.rect(surface, (255, 255, 255), bg_rect, 2, border_radius=8)
+        ty = y + 10
+        for line in lines:
+            txt = font.render(line, True, (255, 255, 255))
+            surface.blit(txt, (x + 10, ty))
+            ty += 22
+        return bg_rect
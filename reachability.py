@@ -0,0 +1,498 @@
+# reachability.py
+
+import argparse
+import math
+import time
+from array import array
+from collections import deque
+
+INF = math.inf
+DIRECTIONS = ["N", "E", "S", "W"]  # Scan order used by AdaptiveController.schedule
+
+
+class Unbounded(Exception):
+    """A place would exceed the encoding bound."""
+
+
+class NetModel:
+    """Discrete view of a PetriNet for state-space exploration.
+
+    Markings are tuples of token counts in place order, packed into one
+    int of `bits` bits per place (so at most 64 bits in total). `env` adds
+    moves that are not transitions of the net, e.g. the controller's token
+    injection; it maps a marking to a list of (label, new marking).
+    """
+
+    def __init__(self, net, bound=3, env=None):
+        self.places = list(net.places.values())
+        self.place_index = {p.name: i for i, p in enumerate(self.places)}
+        self.transitions = sorted(net.transitions, key=lambda t: t.index)
+        self.pre = [[(self.place_index[p.name], w) for p, w in t.inputs.items()] for t in self.transitions]
+        self.post = [[(self.place_index[p.name], w) for p, w in t.outputs.items()] for t in self.transitions]
+        self.bound = bound
+        self.bits = max(1, bound.bit_length())
+        if self.bits * len(self.places) > 64:
+            raise ValueError(f"{len(self.places)} places x {self.bits} bits do not fit a 64-bit marking")
+        self.mask = (1 << self.bits) - 1
+        self.env = env
+
+        # Firing straight on packed keys: input checks as (shift, weight),
+        # capacity checks as (shift, max count before firing), and the whole
+        # token change as one integer to add.
+        bits = self.bits
+        self.key_inputs = [[(p * bits, w) for p, w in pre] for pre in self.pre]
+        self.key_limits, self.key_delta = [], []
+        for pre, post in zip(self.pre, self.post):
+            change = {}
+            for p, w in pre:
+                change[p] = change.get(p, 0) - w
+            for p, w in post:
+                change[p] = change.get(p, 0) + w
+            self.key_limits.append([(p * bits, bound - c) for p, c in change.items() if c > 0])
+            self.key_delta.append(sum(c << (p * bits) for p, c in change.items()))
+
+    def initial(self):
+        return tuple(p.tokens for p in self.places)
+
+    def encode(self, marking):
+        key = 0
+        for i, n in enumerate(marking):
+            key |= n << (i * self.bits)
+        return key
+
+    def decode(self, key):
+        bits, mask = self.bits, self.mask
+        return tuple((key >> (i * bits)) & mask for i in range(len(self.places)))
+
+    def enabled(self, marking):
+        return [t for t, pre in enumerate(self.pre) if all(marking[p] >= w for p, w in pre)]
+
+    def fire(self, marking, t):
+        m = list(marking)
+        for p, w in self.pre[t]:
+            m[p] -= w
+        for p, w in self.post[t]:
+            m[p] += w
+            if m[p] > self.bound:
+                raise Unbounded(self.places[p].name)
+        return tuple(m)
+
+    def successor_keys(self, key):
+        """(transition index, key) for every enabled transition of a packed marking."""
+        mask = self.mask
+        result = []
+        for t, inputs in enumerate(self.key_inputs):
+            for shift, w in inputs:
+                if (key >> shift) & mask < w:
+                    break
+            else:
+                for shift, limit in self.key_limits[t]:
+                    if (key >> shift) & mask > limit:
+                        raise Unbounded(self.transitions[t].name)
+                result.append((t, key + self.key_delta[t]))
+        return result
+
+    def successors(self, marking):
+        """(label, marking) for every transition firing and environment move."""
+        moves = [(self.transitions[t].name, self.fire(marking, t)) for t in self.enabled(marking)]
+        if self.env is not None:
+            for label, m in self.env(marking):
+                if max(m) > self.bound:
+                    raise Unbounded(label)
+                moves.append((label, m))
+        return moves
+
+    def describe(self, marking):
+        return " ".join(f"{p.name}={n}" if n > 1 else p.name
+                        for p, n in zip(self.places, marking) if n) or "(empty)"
+
+
+def controller_env(controller, model, manual=False):
+    """Environment moves of AdaptiveController.schedule (Case A / Case B), optionally manual overrides.
+
+    Which direction gets the Red-Yellow token depends on traffic, so every
+    candidate is a separate move; not injecting (no demand) is covered by
+    simply not taking one.
+    """
+    idx = {d: {k: model.place_index[p.name] for k, p in controller.places[d].items()} for d in DIRECTIONS}
+
+    def env(m):
+        green = [d for d in DIRECTIONS if m[idx[d]["green"]] > 0]
+        yellow = [d for d in DIRECTIONS if m[idx[d]["yellow"]] > 0]
+        ry = [d for d in DIRECTIONS if m[idx[d]["red_yellow"]] > 0]
+        moves = []
+
+        def inject(d, label):
+            new = list(m)
+            new[idx[d]["red_yellow"]] += 1
+            moves.append((label, tuple(new)))
+
+        if yellow and not ry and not green:
+            yellow_dir = yellow[-1]  # schedule() keeps the last one it scanned
+            for d in DIRECTIONS:
+                if d != yellow_dir:
+                    inject(d, f"schedule A: RY {d}")
+        elif not green and not yellow and not ry:
+            for d in DIRECTIONS:
+                inject(d, f"schedule B: RY {d}")
+
+        if manual:
+            for d in DIRECTIONS:
+                new = [0] * len(m)
+                new[idx[d]["red_yellow"]] = 1
+                moves.append((f"force_phase {d}", tuple(new)))
+            enabled = model.enabled(m)
+            if enabled:
+                moves.append((f"step_manual ({model.transitions[enabled[0]].name})", model.fire(m, enabled[0])))
+        return moves
+
+    return env
+
+
+def controller_invariants(controller, model):
+    """The safety properties the controller is meant to keep: name -> predicate on a marking."""
+    green = [model.place_index[controller.places[d]["green"].name] for d in DIRECTIONS]
+    ry = [model.place_index[controller.places[d]["red_yellow"].name] for d in DIRECTIONS]
+    return {
+        "at most one green": lambda m: sum(m[i] for i in green) <= 1,
+        "no green during red-yellow": lambda m: not (any(m[i] for i in green) and any(m[i] for i in ry)),
+    }
+
+
+def compile_invariant(expr, controller, model):
+    """Invariant from a Python expression over `m` (marking tuple), with P (place name -> index)
+    and GREEN, YELLOW, RED_YELLOW (index lists) in scope."""
+    names = {
+        "P": model.place_index,
+        "GREEN": [model.place_index[controller.places[d]["green"].name] for d in DIRECTIONS],
+        "YELLOW": [model.place_index[controller.places[d]["yellow"].name] for d in DIRECTIONS],
+        "RED_YELLOW": [model.place_index[controller.places[d]["red_yellow"].name] for d in DIRECTIONS],
+    }
+    return eval(f"lambda m: {expr}", names)
+
+
+class MarkingTable:
+    """Visited set of packed markings with BFS parent links, in flat arrays.
+
+    States are numbered in insertion (= BFS) order; keys/parents/moves are
+    typed arrays indexed by that number and `slots` is an open-addressing
+    hash index over them, so a state costs about 35 bytes.
+    """
+
+    def __init__(self, capacity=1 << 16):
+        self.keys = array("Q")
+        self.parents = array("q")
+        self.moves = array("H")
+        self._resize(capacity)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _resize(self, capacity):
+        self.capacity = capacity
+        self.slots = array("q", [-1]) * capacity
+        for i, key in enumerate(self.keys):
+            self.slots[self._probe(key)] = i
+
+    def _probe(self, key):
+        mask = self.capacity - 1
+        h = (key * 0x9E3779B97F4A7C15 >> 17) & mask
+        slots, keys = self.slots, self.keys
+        while True:
+            i = slots[h]
+            if i < 0 or keys[i] == key:
+                return h
+            h = (h + 1) & mask
+
+    def add(self, key, parent, move):
+        """Returns (state number, True if new)."""
+        h = self._probe(key)
+        i = self.slots[h]
+        if i >= 0:
+            return i, False
+        i = len(self.keys)
+        self.keys.append(key)
+        self.parents.append(parent)
+        self.moves.append(move)
+        self.slots[h] = i
+        if 2 * len(self.keys) > self.capacity:
+            self._resize(self.capacity * 2)
+        return i, True
+
+
+class Result:
+    def __init__(self, states, edges, seconds, violation=None, trace=None, complete=True):
+        self.states = states
+        self.edges = edges
+        self.seconds = seconds
+        self.violation = violation  # Name of the broken invariant, or None
+        self.trace = trace or []    # [(move label, marking)] from the initial marking
+        self.complete = complete    # False if max_states cut the search short
+
+    def report(self, model):
+        lines = [f"{self.states:,} states, {self.edges:,} edges in {self.seconds:.2f}s"
+                 + ("" if self.complete else " (search cut short)")]
+        if self.violation is None:
+            lines.append("all invariants hold" if self.complete else "no violation found so far")
+        else:
+            lines.append(f"VIOLATED: {self.violation}")
+            for label, marking in self.trace:
+                lines.append(f"  {label or 'initial':<32} {model.describe(marking)}")
+        return "\n".join(lines)
+
+
+def _first_violation(invariants, marking):
+    for name, holds in invariants.items():
+        if not holds(marking):
+            return name
+    return None
+
+
+def explore(model, invariants, max_states=None):
+    """Breadth-first search over untimed markings; stops at the first invariant violation.
+
+    BFS order means the counterexample is a shortest firing sequence.
+    """
+    start = time.perf_counter()
+    table = MarkingTable()
+    labels = [None] + [t.name for t in model.transitions]
+    label_ids = {label: i for i, label in enumerate(labels)}
+    m0 = model.initial()
+    table.add(model.encode(m0), -1, 0)
+    edges = 0
+
+    def trace(i):
+        steps = []
+        while i >= 0:
+            steps.append((labels[table.moves[i]], model.decode(table.keys[i])))
+            i = table.parents[i]
+        return steps[::-1]
+
+    broken = _first_violation(invariants, m0)
+    if broken:
+        return Result(1, 0, time.perf_counter() - start, broken, trace(0))
+
+    cursor = 0
+    while cursor < len(table):
+        if max_states is not None and len(table) >= max_states:
+            return Result(len(table), edges, time.perf_counter() - start, complete=False)
+        key = table.keys[cursor]
+        try:
+            # Transitions are moves 1..T, environment moves are numbered after them
+            moves = [(t + 1, nxt) for t, nxt in model.successor_keys(key)]
+            if model.env is not None:
+                for label, m in model.env(model.decode(key)):
+                    if max(m) > model.bound:
+                        raise Unbounded(label)
+                    move = label_ids.get(label)
+                    if move is None:
+                        move = label_ids[label] = len(labels)
+                        labels.append(label)
+                    moves.append((move, model.encode(m)))
+        except Unbounded as e:
+            return Result(len(table), edges, time.perf_counter() - start,
+                          f"bound {model.bound} exceeded at {e}", trace(cursor))
+        for move, nxt in moves:
+            edges += 1
+            i, new = table.add(nxt, cursor, move)
+            if new and invariants:
+                broken = _first_violation(invariants, model.decode(nxt))
+                if broken:
+                    return Result(len(table), edges, time.perf_counter() - start, broken, trace(i))
+        cursor += 1
+    return Result(len(table), edges, time.perf_counter() - start)
+
+
+# --- Timed exploration over clock zones ---
+# One clock per enabled transition, measuring how long it has been enabled
+# (the same as the age of its youngest input token in PetriNet). Zones are
+# difference-bound matrices D[i][j] >= x_i - x_j over integer milliseconds,
+# index 0 being the constant zero clock.
+
+def _canon(D):
+    n = len(D)
+    for k in range(n):
+        Dk = D[k]
+        for i in range(n):
+            Dik = D[i][k]
+            if Dik == INF:
+                continue
+            Di = D[i]
+            for j in range(n):
+                v = Dik + Dk[j]
+                if v < Di[j]:
+                    Di[j] = v
+        if D[k][k] < 0:
+            return None
+    return D
+
+
+def _extrapolate(D, ceilings):
+    """Drop bounds above each clock's largest constant so the zone graph stays finite."""
+    n = len(D)
+    for i in range(1, n):
+        for j in range(n):
+            if i != j and D[i][j] > ceilings[i]:
+                D[i][j] = INF
+    for j in range(1, n):
+        for i in range(n):
+            if i != j and D[i][j] < -ceilings[j]:
+                D[i][j] = -ceilings[j]
+    return D
+
+
+class ZoneExplorer:
+    """Zone graph of the net as a time Petri net.
+
+    Transition t may fire once enabled for at least lo_t and must fire by
+    hi_t (intervals in seconds, default [min_time, min_time + slack], slack
+    standing for the one-frame polling lag of PetriNet.update).
+    Environment moves are untimed: they may happen at any moment their
+    marking condition holds.
+    """
+
+    def __init__(self, model, intervals=None, slack=1 / 60):
+        self.model = model
+        intervals = intervals or {}
+        self.lo, self.hi = [], []
+        for t in model.transitions:
+            lo, hi = intervals.get(t.name, (t.min_time, t.min_time + slack))
+            self.lo.append(round(lo * 1000))
+            self.hi.append(INF if hi == INF else round(hi * 1000))
+
+    def _ceilings(self, clocks):
+        return [0] + [max(self.lo[t], 0 if self.hi[t] == INF else self.hi[t]) for t in clocks]
+
+    def _successor_zone(self, D, clocks, new_clocks, keep):
+        """Carry persistent clocks over, reset fresh ones, let time pass under the deadlines."""
+        pos = {t: i + 1 for i, t in enumerate(clocks)}
+        src = [0] + [pos[t] if t in keep else None for t in new_clocks]
+        n = len(new_clocks) + 1
+        E = [[0] * n for _ in range(n)]
+        for i in range(n):
+            for j in range(n):
+                si, sj = src[i], src[j]
+                # A fresh clock is 0, i.e. equal to the zero clock
+                E[i][j] = D[si if si is not None else 0][sj if sj is not None else 0]
+        # Delay, bounded by every enabled transition's deadline
+        for i, t in enumerate(new_clocks, 1):
+            E[i][0] = self.hi[t]
+        E = _canon(E)
+        if E is None:
+            return None
+        return _extrapolate(E, self._ceilings(new_clocks))
+
+    def initial(self):
+        m0 = self.model.initial()
+        clocks = self.model.enabled(m0)
+        n = len(clocks) + 1
+        D = self._successor_zone([[0] * n for _ in range(n)], clocks, clocks, set(clocks))
+        return m0, tuple(clocks), D
+
+    def successors(self, marking, clocks, D):
+        model = self.model
+        pos = {t: i + 1 for i, t in enumerate(clocks)}
+        result = []
+        for t in clocks:
+            # Guard: x_t >= lo_t
+            G = [row[:] for row in D]
+            i = pos[t]
+            G[0][i] = min(G[0][i], -self.lo[t])
+            G = _canon(G)
+            if G is None:
+                continue
+            nxt = model.fire(marking, t)
+            # Transitions still enabled after removing t's input tokens keep their clocks
+            intermediate = list(marking)
+            for p, w in model.pre[t]:
+                intermediate[p] -= w
+            still = set(u for u in clocks if u != t and all(intermediate[p] >= w for p, w in model.pre[u]))
+            new_clocks = model.enabled(nxt)
+            Z = self._successor_zone(G, clocks, new_clocks, still)
+            if Z is not None:
+                result.append((model.transitions[t].name, nxt, tuple(new_clocks), Z))
+        if model.env is not None:
+            for label, nxt in model.env(marking):
+                if max(nxt) > model.bound:
+                    raise Unbounded(label)
+                new_clocks = model.enabled(nxt)
+                changed = set(p for p in range(len(nxt)) if nxt[p] != marking[p])
+                keep = set(u for u in clocks if u in new_clocks
+                           and not any(p in changed for p, _ in model.pre[u]))
+                Z = self._successor_zone(D, clocks, new_clocks, keep)
+                if Z is not None:
+                    result.append((label, nxt, tuple(new_clocks), Z))
+        return result
+
+    def explore(self, invariants, max_states=None):
+        start = time.perf_counter()
+        model = self.model
+        m0, c0, D0 = self.initial()
+        key0 = (model.encode(m0), tuple(map(tuple, D0)))
+        parents = {key0: (None, None)}
+        queue = deque([(key0, m0, c0, D0)])
+        edges = 0
+
+        def trace(key):
+            steps = []
+            while key is not None:
+                parent, label = parents[key]
+                steps.append((label, model.decode(key[0])))
+                key = parent
+            return steps[::-1]
+
+        broken = _first_violation(invariants, m0)
+        if broken:
+            return Result(1, 0, time.perf_counter() - start, broken, trace(key0))
+        while queue:
+            if max_states is not None and len(parents) >= max_states:
+                return Result(len(parents), edges, time.perf_counter() - start, complete=False)
+            key, marking, clocks, D = queue.popleft()
+            try:
+                moves = self.successors(marking, clocks, D)
+            except Unbounded as e:
+                return Result(len(parents), edges, time.perf_counter() - start,
+                              f"bound {model.bound} exceeded at {e}", trace(key))
+            for label, nxt, nclocks, Z in moves:
+                edges += 1
+                nkey = (model.encode(nxt), tuple(map(tuple, Z)))
+                if nkey in parents:
+                    continue
+                parents[nkey] = (key, label)
+                broken = _first_violation(invariants, nxt)
+                if broken:
+                    return Result(len(parents), edges, time.perf_counter() - start, broken, trace(nkey))
+                queue.append((nkey, nxt, nclocks, Z))
+        return Result(len(parents), edges, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    from adaptive_controller import AdaptiveController
+    from layout import build_layout
+
+    parser = argparse.ArgumentParser(description="Check safety invariants of the adaptive controller's Petri net.")
+    parser.add_argument("--timed", action="store_true", help="explore clock zones instead of untimed markings")
+    parser.add_argument("--manual", action="store_true", help="include force_phase / step_manual overrides")
+    parser.add_argument("--invariant", action="append", default=[], metavar="EXPR",
+                        help="extra invariant over m, P, GREEN, YELLOW, RED_YELLOW, e.g. 'sum(m[i] for i in YELLOW) <= 1'")
+    parser.add_argument("--bound", type=int, default=3, help="max tokens per place before reporting unboundedness")
+    parser.add_argument("--max-states", type=int, default=None)
+    args = parser.parse_args()
+
+    layout = build_layout()
+    controller = AdaptiveController(layout["poles"], layout["approach_map"])
+    model = NetModel(controller.net, bound=args.bound)
+    model.env = controller_env(controller, model, manual=args.manual)
+
+    invariants = controller_invariants(controller, model)
+    for expr in args.invariant:
+        invariants[expr] = compile_invariant(expr, controller, model)
+
+    if args.timed:
+        # Green length depends on the queue: anywhere from base_green to max_green
+        intervals = {controller.transitions[d]["t_end_green"].name:
+                     (controller.base_green, controller.max_green + 1 / 60) for d in DIRECTIONS}
+        result = ZoneExplorer(model, intervals).explore(invariants, args.max_states)
+    else:
+        result = explore(model, invariants, args.max_states)
+    print(result.report(model))
@@ -0,0 +1,406 @@
+# renderer.py
+#
+# Everything that draws. The simulation core (vehicles, managers,
+# controllers, metrics, modes) never imports pygame; this module and the
+# front-end (main.py) are only loaded when there is a display.
+
+from collections import OrderedDict
+
+import pygame
+
+from sprite_atlas import load_atlas
+from vehicle import VEHICLE_TYPES, APPROACH_HEADING, VEHICLE_WIDTH, SPRITE_COLORS
+
+# --- Colors ---
+BG = (25, 25, 25)
+ROAD = (55, 55, 55)
+LANE = (120, 120, 120)
+WHITE = (230, 230, 230)
+YELLOW = (255, 220, 40)
+RED = (255, 60, 60)
+GREEN = (60, 255, 120)
+SIDEWALK = (85, 85, 85)
+
+
+class TextCache:
+    """Drop-in for pygame.font.Font.render that keeps rendered glyph strips.
+
+    HUD strings repeat from frame to frame, so each distinct
+    (text, antialias, color) is rendered once and reused.
+    """
+
+    def __init__(self, font, max_entries=512):
+        self.font = font
+        self.max_entries = max_entries
+        self.cache = {}
+
+    def render(self, text, antialias, color, background=None):
+        key = (text, antialias, color, background)
+        surf = self.cache.get(key)
+        if surf is None:
+            # Changing values (timers) create new strings forever; start over
+            # rather than growing without bound.
+            if len(self.cache) >= self.max_entries:
+                self.cache.clear()
+            surf = self.font.render(text, antialias, color, background)
+            self.cache[key] = surf
+        return surf
+
+
+# --- Vehicle sprites ---
+# Upright sprites by type and color
+SPRITE_CACHE = {}
+
+# Rotated sprites keyed by (type, color, heading), heading quantized to
+# HEADING_STEP. The four approach headings are pinned; any other heading
+# (turning vehicles) lives in a bounded LRU so a sweep of angles cannot grow
+# memory without limit.
+HEADING_STEP = 5
+ROTATED_CACHE_SIZE = 256
+PINNED_SPRITES = {}
+ROTATED_CACHE = OrderedDict()
+
+
+def load_sprites():
+    """Load the vehicle sprites and tell the vehicles which colors exist. Needs a display."""
+    if SPRITE_CACHE:
+        return
+
+    # convert_alpha() needs a display; headless runs fall back to plain rects
+    if pygame.display.get_surface() is None:
+        return
+
+    # One decode of the pre-scaled, pre-rotated atlas (rebuilt when assets change)
+    colors, sprites = load_atlas("assets", VEHICLE_TYPES, APPROACH_HEADING.values(), VEHICLE_WIDTH)
+    for type_name, type_colors in colors.items():
+        SPRITE_CACHE[type_name] = {c: sprites[(type_name, c, None)] for c in type_colors}
+        SPRITE_COLORS[type_name] = list(type_colors)
+        for c in type_colors:
+            for heading in APPROACH_HEADING.values():
+                PINNED_SPRITES[(type_name, c, heading)] = sprites[(type_name, c, heading)]
+
+
+def get_sprite(type_name, color, heading):
+    """Sprite for (type, color) rotated to heading; rotates at most once per key."""
+    heading = int(round(heading / HEADING_STEP)) * HEADING_STEP % 360
+    key = (type_name, color, heading)
+
+    img = PINNED_SPRITES.get(key)
+    if img is not None:
+        return img
+
+    img = ROTATED_CACHE.get(key)
+    if img is not None:
+        ROTATED_CACHE.move_to_end(key)
+        return img
+
+    base = SPRITE_CACHE.get(type_name, {}).get(color)
+    if base is None:
+        return None
+    img = pygame.transform.rotate(base, heading)
+    ROTATED_CACHE[key] = img
+    if len(ROTATED_CACHE) > ROTATED_CACHE_SIZE:
+        ROTATED_CACHE.popitem(last=False)
+    return img
+
+
+def draw_vehicle(surface, v):
+    """Draw one Vehicle and return the screen rect it covers."""
+    rect = pygame.Rect(v.rect)
+    image = get_sprite(v.type_name, v.color_name, v.heading)
+    if image is not None:
+        surface.blit(image, rect)
+        # Draw separate indicator for ambulance if needed
+        if v.is_ambulance:
+            # Blinking light?
+            if (pygame.time.get_ticks() // 200) % 2 == 0:
+                pygame.draw.circle(surface, (255, 50, 50), rect.center, 8)
+            else:
+                pygame.draw.circle(surface, (50, 50, 255), rect.center, 8)
+    else:
+        pygame.draw.rect(surface, (255, 0, 0), rect, border_radius=4) # Fallback
+    return rect
+
+
+class VehicleView:
+    """Renderer entity for a VehicleManager."""
+
+    def __init__(self, manager):
+        self.manager = manager
+
+    def draw(self, surface):
+        """Draw all vehicles; returns the list of rects touched (for dirty-rect updates)."""
+        rects = []
+        for lane in self.manager.vehicles.values():
+            for v in lane:
+                rects.append(draw_vehicle(surface, v))
+        return rects
+
+
+class ArrayVehicleView:
+    """Renderer entity for a vehicle_arrays.ArrayVehicleManager: plain rects colored by type."""
+
+    def __init__(self, manager):
+        from vehicle_arrays import TYPE_COLORS  # NumPy backend; only loaded when used
+        self.manager = manager
+        self.colors = TYPE_COLORS
+
+    def draw(self, surface):
+        colors = self.colors
+        store = self.manager.store
+        left, top, w, h = store.rects()
+        rects = []
+        for i in range(store.count):
+            color = colors[store.type[i] % len(colors)]
+            rects.append(pygame.draw.rect(surface, color, (left[i], top[i], w[i], h[i]), border_radius=4))
+        return rects
+
+
+class PedestrianView:
+    """Renderer entity for a PedestrianManager."""
+
+    def __init__(self, manager):
+        self.manager = manager
+
+    def draw(self, surface):
+        return [pygame.draw.circle(surface, p.color, (int(p.x), int(p.y)), p.radius)
+                for p in self.manager.pedestrians]
+
+
+def draw_metrics(surface, font, lines):
+    """Metrics panel with the given HUD lines; font may be a TextCache. Returns the panel rect."""
+    # Background
+    bg_rect = pygame.Rect(10, 80, 220, 115)
+    pygame.draw.rect(surface, (0, 0, 0, 180), bg_rect, border_radius=8)
+    pygame.draw.rect(surface, (255, 255, 255), bg_rect, 2, border_radius=8)
+
+    # Text
+    y = 90
+    for line in lines:
+        txt = font.render(line, True, (255, 255, 255))
+        surface.blit(txt, (20, y))
+        y += 25
+    return bg_rect
+
+
+# --- Drawing Helpers ---
+def draw_light(surface, x, y, state="red"):
+    box = pygame.draw.rect(surface, (40, 40, 40), (x - 12, y - 12, 24, 60), border_radius=6)
+    r = 7
+    red_on = state in ("red", "red_yellow")
+    yellow_on = state in ("yellow", "red_yellow")
+    green_on = state == "green"
+    pygame.draw.circle(surface, RED if red_on else (70,70,70), (x, y), r)
+    pygame.draw.circle(surface, YELLOW if yellow_on else (70,70,70), (x, y + 18), r)
+    pygame.draw.circle(surface, GREEN if green_on else (70,70,70), (x, y + 36), r)
+    return box
+
+
+def draw_crosswalk_horizontal(surface, y, x_start, x_end, stripe_w=10, gap=8):
+    x = x_start
+    while x < x_end:
+        pygame.draw.rect(surface, WHITE, (x, y, stripe_w, 30))
+        x += stripe_w + gap
+
+
+def draw_crosswalk_vertical(surface, x, y_start, y_end, stripe_h=10, gap=8):
+    y = y_start
+    while y < y_end:
+        pygame.draw.rect(surface, WHITE, (x, y, 30, stripe_h))
+        y += stripe_h + gap
+
+
+def draw_double_yellow(surface, start_pos, end_pos):
+    # We'll expect vertical or horizontal lines
+    # Draw two lines 4px apart, centered on the abstract line
+    if start_pos[0] == end_pos[0]: # Vertical
+        x = start_pos[0]
+        pygame.draw.line(surface, YELLOW, (x - 3, start_pos[1]), (x - 3, end_pos[1]), 3)
+        pygame.draw.line(surface, YELLOW, (x + 3, start_pos[1]), (x + 3, end_pos[1]), 3)
+    else: # Horizontal
+        y = start_pos[1]
+        pygame.draw.line(surface, YELLOW, (start_pos[0], y - 3), (end_pos[0], y - 3), 3)
+        pygame.draw.line(surface, YELLOW, (start_pos[0], y + 3), (end_pos[0], y + 3), 3)
+
+
+def draw_dashed_white(surface, start_pos, end_pos):
+    if start_pos[0] == end_pos[0]: # Vertical
+        x = start_pos[0]
+        for y in range(int(start_pos[1]), int(end_pos[1]), 40):
+            pygame.draw.line(surface, WHITE, (x, y), (x, min(y + 20, end_pos[1])), 2)
+    else: # Horizontal
+        y = start_pos[1]
+        for x in range(int(start_pos[0]), int(end_pos[0]), 40):
+            pygame.draw.line(surface, WHITE, (x, y), (min(x + 20, end_pos[0]), y), 2)
+
+
+def render_background(layout):
+    """Bake the static intersection (sidewalks, roads, markings) into one surface."""
+    W, H = layout["width"], layout["height"]
+    cx, cy = layout["cx"], layout["cy"]
+    road_width = layout["road_width"]
+    cross_size = layout["cross_size"]
+    stop_lines = layout["road_info"]["stop_lines"]
+
+    surface = pygame.Surface((W, H)).convert()
+    surface.fill(BG)
+
+    # Sidewalks
+    pad = 25
+    pygame.draw.rect(surface, SIDEWALK, pygame.Rect(0, 0, cx - road_width//2 - pad, cy - road_width//2 - pad))
+    pygame.draw.rect(surface, SIDEWALK, pygame.Rect(cx + road_width//2 + pad, 0, W, cy - road_width//2 - pad))
+    pygame.draw.rect(surface, SIDEWALK, pygame.Rect(0, cy + road_width//2 + pad, cx - road_width//2 - pad, H))
+    pygame.draw.rect(surface, SIDEWALK, pygame.Rect(cx + road_width//2 + pad, cy + road_width//2 + pad, W, H))
+
+    # Roads
+    vertical_road = pygame.Rect(cx - road_width // 2, 0, road_width, H)
+    horizontal_road = pygame.Rect(0, cy - road_width // 2, W, road_width)
+    intersection = pygame.Rect(cx - cross_size // 2, cy - cross_size // 2, cross_size, cross_size)
+    pygame.draw.rect(surface, ROAD, vertical_road)
+    pygame.draw.rect(surface, ROAD, horizontal_road)
+    pygame.draw.rect(surface, (45, 45, 45), intersection)
+
+    # --- Road Markings ---
+
+    # 1. Double Yellow Center Lines
+    draw_double_yellow(surface, (cx, 0), (cx, cy - cross_size//2)) # Top
+    draw_double_yellow(surface, (cx, cy + cross_size//2), (cx, H)) # Bottom
+    draw_double_yellow(surface, (0, cy), (cx - cross_size//2, cy)) # Left
+    draw_double_yellow(surface, (cx + cross_size//2, cy), (W, cy)) # Right
+
+    # 2. Lane Dividers (Dashed White) - separating Lane 1 (Inner) and Lane 2 (Outer)
+    # Road Width 220. Center cx. Half 110. Lanes roughly 55 wide.
+    # Divider is at cx +/- 55.
+
+    # Vertical Road
+    draw_dashed_white(surface, (cx - 55, 0), (cx - 55, cy - cross_size//2)) # Top Left (N-bound Incoming)
+    draw_dashed_white(surface, (cx + 55, 0), (cx + 55, cy - cross_size//2)) # Top Right (N-bound Outgoing)
+
+    draw_dashed_white(surface, (cx - 55, cy + cross_size//2), (cx - 55, H)) # Bottom Left (S-bound Outgoing)
+    draw_dashed_white(surface, (cx + 55, cy + cross_size//2), (cx + 55, H)) # Bottom Right (S-bound Incoming)
+
+    # Horizontal Road
+    draw_dashed_white(surface, (0, cy - 55), (cx - cross_size//2, cy - 55)) # Left Top (W-bound Outgoing)
+    draw_dashed_white(surface, (0, cy + 55), (cx - cross_size//2, cy + 55)) # Left Bottom (W-bound Incoming)
+
+    draw_dashed_white(surface, (cx + cross_size//2, cy - 55), (W, cy - 55)) # Right Top (E-bound Incoming)
+    draw_dashed_white(surface, (cx + cross_size//2, cy + 55), (W, cy + 55)) # Right Bottom (E-bound Outgoing)
+
+    # 3. Shoulder Lines (Solid White) at Road Edges
+    # Edges at cx +/- 110
+
+    # Vertical
+    pygame.draw.line(surface, WHITE, (cx - 110, 0), (cx - 110, cy - cross_size//2), 3) # Top Left Edge
+    pygame.draw.line(surface, WHITE, (cx + 110, 0), (cx + 110, cy - cross_size//2), 3) # Top Right Edge
+    pygame.draw.line(surface, WHITE, (cx - 110, cy + cross_size//2), (cx - 110, H), 3) # Bottom Left Edge
+    pygame.draw.line(surface, WHITE, (cx + 110, cy + cross_size//2), (cx + 110, H), 3) # Bottom Right Edge
+
+    # Horizontal
+    pygame.draw.line(surface, WHITE, (0, cy - 110), (cx - cross_size//2, cy - 110), 3) # Left Top Edge
+    pygame.draw.line(surface, WHITE, (0, cy + 110), (cx - cross_size//2, cy + 110), 3) # Left Bottom Edge
+    pygame.draw.line(surface, WHITE, (cx + cross_size//2, cy - 110), (W, cy - 110), 3) # Right Top Edge
+    pygame.draw.line(surface, WHITE, (cx + cross_size//2, cy + 110), (W, cy + 110), 3) # Right Bottom Edge
+
+    # Crosswalks
+    draw_crosswalk_horizontal(surface, intersection.top - 55, cx - road_width // 2 + 20, cx + road_width // 2 - 20)
+    draw_crosswalk_horizontal(surface, intersection.bottom + 25, cx - road_width // 2 + 20, cx + road_width // 2 - 20)
+    draw_crosswalk_vertical(surface, intersection.left - 55, cy - road_width // 2 + 20, cy + road_width // 2 - 20)
+    draw_crosswalk_vertical(surface, intersection.right + 25, cy - road_width // 2 + 20, cy + road_width // 2 - 20)
+
+    # Stop lines
+    stop_len = road_width - 40
+    pygame.draw.rect(surface, WHITE, pygame.Rect(cx - stop_len//2, stop_lines["N"], stop_len, 8))
+    pygame.draw.rect(surface, WHITE, pygame.Rect(cx - stop_len//2, stop_lines["S"], stop_len, 8))
+    pygame.draw.rect(surface, WHITE, pygame.Rect(stop_lines["W"], cy - stop_len//2, 8, stop_len))
+    pygame.draw.rect(surface, WHITE, pygame.Rect(stop_lines["E"], cy - stop_len//2, 8, stop_len))
+
+    return surface
+
+
+class Renderer:
+    """Retained-mode drawing with dirty rectangles.
+
+    The static intersection is a pre-rendered background. Each frame only
+    the areas under moving entities, plus overlays (lights, HUD) whose
+    content changed or that an entity passed over, are restored and
+    pushed to the display.
+
+    Per frame:
+        renderer.begin_frame()
+        renderer.draw_entities([VehicleView(vm), ...])   # each draw() returns its rects
+        renderer.overlay("hud", key, draw_fn)             # draw_fn(surface) -> rect
+        renderer.end_frame()
+
+    begin_frame(entities=False) asks to leave the entities as last drawn
+    and only refresh overlays, to skip vehicle frames at high simulation
+    speeds; skip draw_entities() while `entities_frozen` is set (it is not
+    after an invalidate()).
+    """
+
+    def __init__(self, screen, layout):
+        load_sprites()
+        self.screen = screen
+        self.background = render_background(layout)
+        self.entities = []
+        self.entity_rects = []   # Screen areas covered by entities last frame
+        self.overlays = {}       # name -> (key, rect)
+        self.dirty = []
+        self.full_redraw = True
+        self.entities_frozen = False
+
+    def invalidate(self):
+        """Force a full repaint on the next frame (e.g. after a window expose)."""
+        self.full_redraw = True
+
+    def begin_frame(self, entities=True):
+        self.dirty = []
+        # A full redraw wipes the entities, so it always needs them drawn again
+        self.entities_frozen = not entities and not self.full_redraw
+        if self.entities_frozen:
+            return
+        if self.full_redraw:
+            self.screen.blit(self.background, (0, 0))
+            self.overlays.clear()
+            self.entity_rects = []
+            return
+
+        # Erase last frame's entities
+        for rect in self.entity_rects:
+            self.screen.blit(self.background, rect, rect)
+        self.dirty.extend(self.entity_rects)
+
+    def draw_entities(self, entities):
+        self.entities = entities
+        rects = []
+        for entity in entities:
+            rects.extend(entity.draw(self.screen))
+        self.entity_rects = rects
+        self.dirty.extend(rects)
+
+    def overlay(self, name, key, draw_fn):
+        """Redraw an overlay only if its key changed or an entity touched it."""
+        prev = self.overlays.get(name)
+        if prev is not None:
+            prev_key, prev_rect = prev
+            if prev_key == key and prev_rect.collidelist(self.dirty) == -1:
+                return
+            # Restore the overlay's area, including any entity parts under it
+            self.screen.blit(self.background, prev_rect, prev_rect)
+            if not self.entities_frozen:
+                # (Frozen: entities have moved on since they were drawn; they reappear next frame)
+                self.screen.set_clip(prev_rect)
+                for entity in self.entities:
+                    entity.draw(self.screen)
+                self.screen.set_clip(None)
+            self.dirty.append(prev_rect)
+
+        rect = draw_fn(self.screen)
+        self.overlays[name] = (key, rect)
+        self.dirty.append(rect)
+
+    def end_frame(self):
+        if self.full_redraw:
+            pygame.display.flip()
+            self.full_redraw = False
+        elif self.dirty:
+            pygame.display.update(self.dirty)
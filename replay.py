@@ -0,0 +1,63 @@
+# replay.py
+
+import json
+
+
+class Recording:
+    """Compact log of the inputs that entered a run: spawns and manual presses.
+
+    Events are stored as flat lists [frame, kind, *args], where frame is the
+    SimClock step at which the event happened. Replaying a recording with the
+    same dt reproduces the run at full speed, even if the RNG call pattern
+    changed in between (which a seed alone would not survive).
+    """
+
+    VERSION = 1
+
+    def __init__(self, seed=None, dt=1 / 60, mode=None, events=None):
+        self.seed = seed
+        self.dt = dt
+        self.mode = mode
+        self.events = events if events is not None else []
+        self._cursor = {}  # kind -> index of the next unreplayed event
+
+    def record(self, frame, kind, *args):
+        self.events.append([frame, kind, *args])
+
+    def due(self, frame, kind):
+        """Events of `kind` recorded at `frame`, in order. Frames must be asked in order."""
+        return [event[1:] for event in self.due_inputs(frame, (kind,))]
+
+    def due_inputs(self, frame, kinds):
+        """Events of any of `kinds` recorded at `frame` as [kind, *args], in recorded order."""
+        events = self.events
+        i = self._cursor.get(kinds, 0)
+        found = []
+        while i < len(events):
+            event = events[i]
+            if event[0] > frame:
+                break
+            if event[0] == frame and event[1] in kinds:
+                found.append(event[1:])
+            i += 1
+        # Each caller's kinds keep their own cursor, so the event list is walked once per caller
+        self._cursor[kinds] = i
+        return found
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({
+                "version": self.VERSION,
+                "seed": self.seed,
+                "dt": self.dt,
+                "mode": self.mode,
+                "events": self.events,
+            }, f, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("version") != cls.VERSION:
+            raise ValueError(f"Unsupported recording version: {data.get('version')}")
+        return cls(data["seed"], data["dt"], data["mode"], data["events"])
@@ -0,0 +1,42 @@
+# sim_clock.py
+
+import random
+
+
+class SimClock:
+    """Simulated time shared by everything in one run.
+
+    Advanced once per fixed simulation step by whoever drives the run
+    (SimulationEngine, or main.py's loop), never by reading the wall clock,
+    so a run is reproducible and can go as fast as the CPU allows.
+    """
+
+    def __init__(self, start=0.0):
+        self.now = start
+        self.frame = 0  # Number of steps taken
+
+    def advance(self, dt):
+        self.now += dt
+        self.frame += 1
+
+    def ticks_ms(self):
+        """Drop-in for pygame.time.get_ticks()."""
+        return int(self.now * 1000)
+
+
+def fresh_seed():
+    """A new run seed from OS entropy, for runs started without one."""
+    return random.SystemRandom().randrange(2 ** 63)
+
+
+def rng_streams(seed, names=("spawn", "vehicles")):
+    """Independent random.Random per subsystem, all derived from one run seed.
+
+    Separate streams keep e.g. vehicle type draws from shifting the spawn
+    schedule when one subsystem changes how many numbers it consumes.
+    Callers resolve a missing seed with fresh_seed() first and keep it, so
+    the run can still be reproduced.
+    """
+    if seed is None:
+        raise ValueError("rng_streams needs a seed; use fresh_seed() for an unseeded run")
+    return {name: random.Random(f"{seed}:{name}") for name in names}
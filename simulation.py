@@ -0,0 +1,227 @@
+# simulation.py
+
+import argparse
+import time
+
+from adaptive_controller import AdaptiveController
+from vehicle import VehicleManager
+from game_modes import AutomaticMode, ManualSurvivalMode, ScenarioChallengeMode
+from metrics import Metrics
+from layout import build_layout
+from sim_clock import SimClock, fresh_seed, rng_streams
+from replay import Recording
+
+
+# Every mode a run can start in or switch to; recordings name them by class
+HEADLESS_MODES = {
+    "automatic": AutomaticMode,
+    "manual": ManualSurvivalMode,
+    "challenge": ScenarioChallengeMode,
+}
+
+# Inputs re-applied on replay: mode switches (SimulationEngine.switch_mode)
+# and the manual inputs a mode logs (see GameMode.replay_input)
+INPUT_KINDS = ("mode", "press")
+
+
+def mode_class(name):
+    """Mode class by class name, as stored in a Recording."""
+    for cls in HEADLESS_MODES.values():
+        if cls.__name__ == name:
+            return cls
+    raise ValueError(f"Recording uses unknown mode {name!r}; known: "
+                     f"{', '.join(cls.__name__ for cls in HEADLESS_MODES.values())}")
+
+
+class SimulationEngine:
+    """Headless fixed-timestep driver for one intersection.
+
+    Owns the controller, vehicle manager, metrics and game mode and steps
+    them with a constant dt, independent of any window or wall clock.
+
+    Everything reads time from one SimClock and draws from RNG streams
+    derived from `seed`, so the same seed gives the same run (seed=None
+    draws a fresh one, kept in `self.seed` and any recording). With
+    record=True spawns and manual inputs are logged to `self.recording`;
+    passing a Recording as `replay` re-runs it with its own dt and seed.
+    """
+
+    def __init__(self, mode_cls=AutomaticMode, dt=1 / 60, layout=None,
+                 controller_cls=AdaptiveController, controller_kwargs=None,
+                 vehicle_manager_cls=VehicleManager, vehicle_manager_kwargs=None,
+                 seed=None, record=False, replay=None, export_prefix=None, export_format="csv"):
+        if replay is not None:
+            dt, seed = replay.dt, replay.seed
+        if seed is None:
+            seed = fresh_seed()
+        self.dt = dt
+        self.seed = seed
+        self.layout = layout or build_layout()
+        self.clock = SimClock()
+        self.rngs = rng_streams(seed)
+        self.recording = Recording(seed, dt, mode_cls.__name__) if record else None
+        self.replay = replay
+
+        self.road_info = self.layout["road_info"]
+        self.poles = self.layout["poles"]
+        self.approach_map = self.layout["approach_map"]
+
+        vm_kwargs = {"clock": self.clock, "rng": self.rngs["spawn"], "vehicle_rng": self.rngs["vehicles"]}
+        if self.recording is not None:
+            vm_kwargs["recorder"] = self.recording
+        if replay is not None:
+            vm_kwargs["replay"] = replay
+        vm_kwargs.update(vehicle_manager_kwargs or {})
+
+        self.vehicle_manager = vehicle_manager_cls(self.road_info, **vm_kwargs)
+        self.controller = controller_cls(self.poles, self.approach_map, **(controller_kwargs or {}))
+        self.controller.apply_states()
+        self.metrics = Metrics(self.clock, export_prefix, export_format)
+        self.modes = {}  # class name -> attached mode, reused when switching back
+        self.mode = self.attach_mode(mode_cls(self.controller, self.vehicle_manager))
+
+        self.sim_time = 0.0
+        self.steps = 0
+        # Optional profiling.FrameProfiler; step() laps "update" and "metrics"
+        self.profiler = None
+        # Optional telemetry.TelemetryServer; offered the engine after every step
+        self.telemetry = None
+
+    def attach_mode(self, mode):
+        """Give a mode (built on this engine's controller/vehicles) the run's clock and recorder."""
+        mode.clock = self.clock
+        mode.recorder = self.recording
+        self.modes[type(mode).__name__] = mode
+        return mode
+
+    def switch_mode(self, mode):
+        """Make an attached mode the active one; its scores start over, and the switch is recorded."""
+        if self.recording is not None:
+            self.recording.record(self.clock.frame, "mode", type(mode).__name__)
+        self.mode = mode
+        self.metrics.reset()
+
+    def step(self):
+        if self.replay is not None:
+            for kind, *args in self.replay.due_inputs(self.clock.frame, INPUT_KINDS):
+                if kind == "mode":
+                    name = args[0]
+                    mode = self.modes.get(name)
+                    if mode is None:
+                        mode = self.attach_mode(mode_class(name)(self.controller, self.vehicle_manager))
+                    self.switch_mode(mode)
+                else:
+                    self.mode.replay_input(kind, *args)
+        self.clock.advance(self.dt)
+        self.mode.update(self.dt)
+        if self.profiler is not None:
+            self.profiler.lap("update")
+        self.metrics.update(self.vehicle_manager, self.mode.get_light_states())
+        if self.profiler is not None:
+            self.profiler.lap("metrics")
+        self.steps += 1
+        self.sim_time = self.steps * self.dt
+        if self.telemetry is not None:
+            self.telemetry.offer(self)
+
+    def run(self, seconds):
+        """Advance the simulation by `seconds` of simulated time."""
+        n_steps = int(round(seconds / self.dt))
+        for _ in range(n_steps):
+            self.step()
+        return n_steps
+
+    def run_hours(self, hours):
+        return self.run(hours * 3600.0)
+
+    def close(self):
+        """Finish streaming the metrics export, if any."""
+        self.metrics.close()
+
+    def light_states(self):
+        return self.mode.get_light_states()
+
+    def summary(self):
+        metrics = self.metrics.summary()
+        return {
+            "seed": self.seed,
+            "sim_time": self.sim_time,
+            "steps": self.steps,
+            "vehicles": sum(len(lane) for lane in self.vehicle_manager.vehicles.values()),
+            "spawned": self.vehicle_manager.next_id,
+            "exited": self.vehicle_manager.exited,
+            "max_queue": self.metrics.max_queue_length,
+            "throughput_per_hour": metrics["throughput_per_hour"],
+            "mean_delay": metrics["mean_delay"],
+            "stops_per_vehicle": metrics["stops_per_vehicle"],
+            "phases": metrics["phases"],
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the intersection without a display.")
+    parser.add_argument("--hours", type=float, default=1.0, help="simulated hours to run")
+    parser.add_argument("--dt", type=float, default=1 / 60, help="fixed timestep in seconds")
+    parser.add_argument("--mode", choices=sorted(HEADLESS_MODES), default="automatic")
+    parser.add_argument("--net", choices=["dict", "numpy", "compiled"], default="dict", help="Petri net backend")
+    parser.add_argument("--net-file", metavar="PATH", help="controller net definition (.json/.pnml) to run")
+    parser.add_argument("--vehicles", choices=["objects", "arrays"], default="objects",
+                        help="vehicle store: one Vehicle per car, or NumPy structure-of-arrays")
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible runs")
+    parser.add_argument("--record", metavar="PATH", help="save spawns and inputs to PATH")
+    parser.add_argument("--replay", metavar="PATH", help="re-run a recording (uses its dt, seed and mode)")
+    parser.add_argument("--export", metavar="PREFIX", help="stream vehicle and phase events to PREFIX-*.csv/.bin")
+    parser.add_argument("--export-format", choices=["csv", "bin"], default="csv")
+    parser.add_argument("--telemetry", type=int, metavar="PORT",
+                        help="stream live state as NDJSON on localhost:PORT (WebSocket on PORT+1)")
+    parser.add_argument("--telemetry-rate", type=float, default=10.0, metavar="HZ",
+                        help="telemetry frames per wall-clock second")
+    args = parser.parse_args()
+    if args.vehicles == "arrays" and (args.record or args.replay):
+        parser.error("--record/--replay need --vehicles objects")
+
+    replay = Recording.load(args.replay) if args.replay else None
+    mode_cls = HEADLESS_MODES[args.mode]
+    if replay is not None and replay.mode:
+        try:
+            mode_cls = mode_class(replay.mode)
+        except ValueError as e:
+            parser.error(str(e))
+
+    controller_kwargs = {}
+    if args.net == "numpy":
+        from petri_net_np import MatrixPetriNet
+        controller_kwargs["net_cls"] = MatrixPetriNet
+    elif args.net == "compiled":
+        from petri_compiled import CompiledPetriNet
+        controller_kwargs["net_cls"] = CompiledPetriNet
+    if args.net_file:
+        controller_kwargs["net_file"] = args.net_file
+
+    vehicle_manager_cls = VehicleManager
+    if args.vehicles == "arrays":
+        from vehicle_arrays import ArrayVehicleManager
+        vehicle_manager_cls = ArrayVehicleManager
+
+    engine = SimulationEngine(mode_cls=mode_cls, dt=args.dt,
+                              controller_kwargs=controller_kwargs,
+                              vehicle_manager_cls=vehicle_manager_cls,
+                              seed=args.seed, record=bool(args.record), replay=replay,
+                              export_prefix=args.export, export_format=args.export_format)
+    if args.telemetry is not None:
+        from telemetry import TelemetryServer
+        engine.telemetry = TelemetryServer(port=args.telemetry, ws_port=args.telemetry + 1,
+                                           rate=args.telemetry_rate).start()
+    wall_start = time.perf_counter()
+    engine.run_hours(args.hours)
+    engine.close()
+    if engine.telemetry is not None:
+        engine.telemetry.stop()
+    wall = time.perf_counter() - wall_start
+
+    for key, value in engine.summary().items():
+        print(f"{key}: {value}")
+    print(f"wall_time: {wall:.2f}s ({engine.sim_time / wall:.1f}x real time)")
+
+    if args.record:
+        engine.recording.save(args.record)
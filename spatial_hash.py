@@ -0,0 +1,68 @@
+# spatial_hash.py
+
+
+class SpatialHash:
+    """Uniform-grid index over axis-aligned boxes.
+
+    Rebuilt once per tick (clear + insert) and then queried by rect or
+    radius. Queries return candidates from the touched cells, filtered
+    against the boxes stored at insert time.
+
+    Rects are (left, top, width, height) sequences; pygame.Rect works too.
+    """
+
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self.cells = {}  # (cx, cy) -> list of (item, rect)
+
+    def clear(self):
+        self.cells.clear()
+
+    def _cell_range(self, left, top, width, height):
+        size = self.cell_size
+        return (int(left // size), int((left + width) // size),
+                int(top // size), int((top + height) // size))
+
+    def insert(self, item, rect):
+        left, top, width, height = rect
+        x0, x1, y0, y1 = self._cell_range(left, top, width, height)
+        entry = (item, (left, top, width, height))
+        cells = self.cells
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket is None:
+                    cells[(cx, cy)] = [entry]
+                else:
+                    bucket.append(entry)
+
+    def query_rect(self, rect):
+        """Items whose stored box overlaps rect."""
+        left, top, width, height = rect
+        right, bottom = left + width, top + height
+        return [item for item, (l, t, w, h) in self._entries_in(left, top, width, height)
+                if l < right and left < l + w and t < bottom and top < t + h]
+
+    def query_radius(self, x, y, radius):
+        """Items whose stored box comes within radius of (x, y)."""
+        found = []
+        r2 = radius * radius
+        for item, (l, t, w, h) in self._entries_in(x - radius, y - radius, 2 * radius, 2 * radius):
+            # Distance from the point to the nearest point of the box
+            dx = max(l - x, 0, x - (l + w))
+            dy = max(t - y, 0, y - (t + h))
+            if dx * dx + dy * dy <= r2:
+                found.append(item)
+        return found
+
+    def _entries_in(self, left, top, width, height):
+        x0, x1, y0, y1 = self._cell_range(left, top, width, height)
+        seen = set()
+        cells = self.cells
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                for entry in cells.get((cx, cy), ()):
+                    key = id(entry[0])
+                    if key not in seen:
+                        seen.add(key)
+                        yield entry
@@ -0,0 +1,161 @@
+# sprite_atlas.py
+
+import argparse
+import json
+import math
+import os
+import time
+
+import pygame
+
+ATLAS_VERSION = 1
+CACHE_DIR = "sprite_cache"
+PADDING = 1  # Transparent gap between sprites
+
+
+def asset_signature(base_path, vehicle_types, headings, sprite_width):
+    """Everything the atlas depends on: source files (by mtime and size), specs and headings."""
+    files = []
+    for folder in sorted({specs["folder"] for specs in vehicle_types.values() if specs.get("folder")}):
+        path = os.path.join(base_path, folder)
+        if not os.path.isdir(path):
+            continue
+        for f in sorted(os.listdir(path)):
+            if f.endswith(".png"):
+                st = os.stat(os.path.join(path, f))
+                files.append([f"{folder}/{f}", st.st_mtime_ns, st.st_size])
+    return {
+        "version": ATLAS_VERSION,
+        "files": files,
+        "types": {name: [specs.get("folder"), specs["length"]] for name, specs in vehicle_types.items()},
+        "headings": sorted(headings),
+        "width": sprite_width,
+    }
+
+
+def scan_sprites(base_path, vehicle_types, headings, sprite_width):
+    """Decode and scale every vehicle sprite: ({type: [colors]}, [((type, color, heading), surface)]).
+
+    heading None is the upright (unrotated) sprite. File names are
+    <type>_<color>.png; others are skipped. Colors keep directory order,
+    the order vehicles pick them from.
+    """
+    colors, sprites = {}, []
+    for type_name, specs in vehicle_types.items():
+        folder = specs.get("folder")
+        if not folder:
+            continue
+        path = os.path.join(base_path, folder)
+        if not os.path.exists(path):
+            continue
+        colors[type_name] = []
+        for f in os.listdir(path):
+            parts = f.split("_")
+            if not f.endswith(".png") or len(parts) < 2:
+                continue
+            color = parts[1].replace(".png", "")
+            # Original sprites face UP; scale to the standard width and the type's length
+            img = pygame.transform.scale(pygame.image.load(os.path.join(path, f)),
+                                         (sprite_width, specs["length"]))
+            colors[type_name].append(color)
+            sprites.append(((type_name, color, None), img))
+            for heading in headings:
+                sprites.append(((type_name, color, heading), pygame.transform.rotate(img, heading)))
+    return colors, sprites
+
+
+def pack(sizes, padding=PADDING):
+    """Shelf packing: positions for (w, h) sizes, tallest first, and the atlas (width, height).
+
+    The width is about the square root of the total area, so little of
+    the atlas is wasted.
+    """
+    area = sum((w + padding) * (h + padding) for w, h in sizes)
+    width = max([int(math.sqrt(area) * 1.1)] + [w for w, _ in sizes])
+    order = sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0]))
+    positions = [None] * len(sizes)
+    x = y = shelf_h = 0
+    for i in order:
+        w, h = sizes[i]
+        if x + w > width and x > 0:
+            y += shelf_h + padding
+            x = shelf_h = 0
+        positions[i] = (x, y)
+        x += w + padding
+        shelf_h = max(shelf_h, h)
+    return positions, (width, max(1, y + shelf_h))
+
+
+def build_atlas(base_path, vehicle_types, headings, sprite_width, cache_dir=CACHE_DIR):
+    """Render all sprites into one image and write its JSON index next to it; returns the index."""
+    colors, sprites = scan_sprites(base_path, vehicle_types, headings, sprite_width)
+    positions, size = pack([img.get_size() for _, img in sprites])
+    atlas = pygame.Surface(size, pygame.SRCALPHA)
+    entries = []
+    for (key, img), (x, y) in zip(sprites, positions):
+        atlas.blit(img, (x, y))
+        entries.append([*key, [x, y, *img.get_size()]])
+
+    index = {
+        "signature": asset_signature(base_path, vehicle_types, headings, sprite_width),
+        "size": list(size),
+        "colors": colors,
+        "sprites": entries,
+    }
+    os.makedirs(cache_dir, exist_ok=True)
+    image_path, index_path = _paths(cache_dir)
+    # Write to temporary names, then rename: concurrent workers never read half a file
+    tmp = f".{os.getpid()}.tmp"
+    with open(image_path + tmp, "wb") as f:
+        f.write(pygame.image.tobytes(atlas, "RGBA"))
+    with open(index_path + tmp, "w") as f:
+        json.dump(index, f)
+    os.replace(image_path + tmp, image_path)
+    os.replace(index_path + tmp, index_path)
+    return index
+
+
+def _paths(cache_dir):
+    # Raw RGBA pixels: loading is a single copy, no PNG decompression
+    return os.path.join(cache_dir, "vehicles.rgba"), os.path.join(cache_dir, "vehicles.json")
+
+
+def load_atlas(base_path, vehicle_types, headings, sprite_width, cache_dir=CACHE_DIR):
+    """Vehicle sprites from the atlas, rebuilding it first if any source changed.
+
+    Returns ({type: [colors]}, {(type, color, heading): surface}), the
+    surfaces being subsurfaces of one decoded image. Converted for fast
+    blits when a display exists.
+    """
+    headings = list(headings)
+    image_path, index_path = _paths(cache_dir)
+    index = None
+    if os.path.exists(image_path) and os.path.exists(index_path):
+        with open(index_path) as f:
+            index = json.load(f)
+        if index.get("signature") != asset_signature(base_path, vehicle_types, headings, sprite_width):
+            index = None
+    if index is None:
+        index = build_atlas(base_path, vehicle_types, headings, sprite_width, cache_dir)
+
+    with open(image_path, "rb") as f:
+        atlas = pygame.image.frombytes(f.read(), tuple(index["size"]), "RGBA")
+    if pygame.display.get_surface() is not None:
+        atlas = atlas.convert_alpha()
+    sprites = {(type_name, color, heading): atlas.subsurface(rect)
+               for type_name, color, heading, rect in index["sprites"]}
+    return index["colors"], sprites
+
+
+if __name__ == "__main__":
+    from vehicle import VEHICLE_TYPES, APPROACH_HEADING, VEHICLE_WIDTH
+
+    parser = argparse.ArgumentParser(description="Build the vehicle sprite atlas ahead of the first run.")
+    parser.add_argument("--assets", default="assets")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = build_atlas(args.assets, VEHICLE_TYPES, APPROACH_HEADING.values(), VEHICLE_WIDTH, args.cache_dir)
+    print(f"{len(index['sprites'])} sprites packed into {_paths(args.cache_dir)[0]} "
+          f"in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,300 @@
+# telemetry.py
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import socket
+import struct
+import threading
+import time
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC11B65"
+
+
+def snapshot(engine):
+    """One telemetry frame from a SimulationEngine, as plain JSON-ready data."""
+    vm = engine.vehicle_manager
+    lanes = {}
+    for direction in vm.vehicles:
+        q_len, max_wait = vm.get_lane_info(direction)
+        lanes[direction] = {"queue": int(q_len), "max_wait": float(max_wait)}
+    net = getattr(engine.controller, "net", None)
+    return {
+        "sim_time": engine.sim_time,
+        "frame": engine.steps,
+        "mode": engine.mode.name,
+        "poles": {p["name"]: p["state"] for p in engine.poles},
+        "lights": engine.light_states(),
+        "marking": {name: p.tokens for name, p in net.places.items()} if net is not None else {},
+        "lanes": lanes,
+        "metrics": engine.metrics.summary(),
+    }
+
+
+class _Client:
+    """One connected viewer: holds at most one unsent frame.
+
+    A newer frame replaces the pending one, so a slow client skips frames
+    instead of queueing them; `dropped` counts the skipped ones.
+    """
+
+    def __init__(self, writer, websocket):
+        self.writer = writer
+        self.websocket = websocket
+        self.pending = None
+        self.ready = asyncio.Event()
+        self.dropped = 0
+
+    def offer(self, data):
+        if self.pending is not None:
+            self.dropped += 1
+        self.pending = data
+        self.ready.set()
+
+    def encode(self, data):
+        if not self.websocket:
+            return data + b"\n"
+        # Unmasked text frame, as servers send them
+        n = len(data)
+        if n < 126:
+            header = struct.pack("!BB", 0x81, n)
+        elif n < 1 << 16:
+            header = struct.pack("!BBH", 0x81, 126, n)
+        else:
+            header = struct.pack("!BBQ", 0x81, 127, n)
+        return header + data
+
+
+class TelemetryServer:
+    """Streams live simulation state to local dashboards.
+
+    An asyncio loop on a daemon thread serves newline-delimited JSON over
+    TCP on `port` and the same frames as WebSocket text messages on
+    `ws_port` (None disables either). The simulation calls offer(engine)
+    every step; at most `rate` times a wall-clock second that builds a
+    snapshot() and drops it into a single slot, a plain attribute store,
+    so the loop never takes a lock or waits for a client. The server
+    thread picks up the newest frame, encodes it once and hands it to each
+    client, which drops stale frames when it cannot keep up.
+
+        server = TelemetryServer(port=8765).start()
+        engine.telemetry = server
+        ...
+        server.stop()
+    """
+
+    def __init__(self, host="127.0.0.1", port=8765, ws_port=8766, rate=10.0):
+        self.host = host
+        self.port = port
+        self.ws_port = ws_port
+        self.rate = rate
+        self.frames_sent = 0
+        self.clients = set()
+
+        self._handlers = set()
+        self._latest = None  # (sequence, frame); replaced whole, never mutated
+        self._sequence = 0
+        self._next_publish = 0.0
+        self._thread = None
+        self._loop = None
+        self._stopping = None
+        self._started = threading.Event()
+        self._error = None
+
+    # --- Simulation side ---
+
+    def offer(self, engine):
+        """Publish a frame from engine if one is due."""
+        now = time.monotonic()
+        if now < self._next_publish:
+            return
+        self._next_publish = now + 1.0 / self.rate
+        self.publish(snapshot(engine))
+
+    def publish(self, frame):
+        """Make frame the latest; the server thread sends it on its next tick."""
+        self._sequence += 1
+        self._latest = (self._sequence, frame)
+
+    # --- Lifecycle ---
+
+    def start(self):
+        """Start serving on a background thread; raises if a port cannot be bound."""
+        self._thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+        self._thread.start()
+        self._started.wait()
+        if self._error is not None:
+            raise self._error
+        return self
+
+    def stop(self):
+        """Send the last frame, close every client and join the thread."""
+        if self._thread is not None and self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._stopping.set)
+            self._thread.join()
+
+    def _run(self):
+        try:
+            asyncio.run(self._serve())
+        except Exception as e:
+            self._error = e
+            self._started.set()
+
+    async def _serve(self):
+        self._loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        servers = []
+        try:
+            if self.port is not None:
+                servers.append(await asyncio.start_server(
+                    lambda r, w: self._handle(r, w, False), self.host, self.port))
+            if self.ws_port is not None:
+                servers.append(await asyncio.start_server(
+                    lambda r, w: self._handle(r, w, True), self.host, self.ws_port))
+        except OSError:
+            for server in servers:
+                server.close()
+            raise
+        self._started.set()
+
+        sent = 0
+        while True:
+            stopping = self._stopping.is_set()
+            latest = self._latest
+            if latest is not None and latest[0] != sent:
+                sent = latest[0]
+                data = json.dumps(latest[1], separators=(",", ":")).encode()
+                for client in self.clients:
+                    client.offer(data)
+                self.frames_sent += 1
+            if stopping:
+                break
+            try:
+                await asyncio.wait_for(self._stopping.wait(), 1.0 / self.rate)
+            except asyncio.TimeoutError:
+                pass
+
+        for server in servers:
+            server.close()
+        # Let writers flush the final frame, then hang up
+        for client in list(self.clients):
+            client.ready.set()
+        await asyncio.sleep(0)
+        for client in list(self.clients):
+            client.writer.close()
+        # close() waits for the send buffer; a client that stopped reading is cut off
+        handlers = asyncio.gather(*self._handlers, return_exceptions=True)
+        try:
+            await asyncio.wait_for(asyncio.shield(handlers), 1.0)
+        except asyncio.TimeoutError:
+            for client in list(self.clients):
+                client.writer.transport.abort()
+            await handlers
+        for server in servers:
+            await server.wait_closed()
+
+    # --- Clients ---
+
+    async def _handle(self, reader, writer, websocket):
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        try:
+            await self._serve_client(reader, writer, websocket)
+        finally:
+            self._handlers.discard(task)
+
+    async def _serve_client(self, reader, writer, websocket):
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # A small transport buffer makes drain() wait early, so frames drop here rather than pile up
+        writer.transport.set_write_buffer_limits(high=64 * 1024)
+        if websocket and not await self._ws_handshake(reader, writer):
+            writer.close()
+            return
+
+        client = _Client(writer, websocket)
+        self.clients.add(client)
+        latest = self._latest
+        if latest is not None:
+            client.offer(json.dumps(latest[1], separators=(",", ":")).encode())
+        send = asyncio.create_task(self._send_loop(client))
+        try:
+            await self._read_loop(reader, client)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.clients.discard(client)
+            send.cancel()
+            writer.close()
+
+    async def _send_loop(self, client):
+        writer = client.writer
+        try:
+            while not writer.is_closing():
+                await client.ready.wait()
+                client.ready.clear()
+                data, client.pending = client.pending, None
+                if data is None:
+                    continue
+                writer.write(client.encode(data))
+                await writer.drain()
+        except ConnectionError:
+            writer.close()
+
+    async def _read_loop(self, reader, client):
+        """Wait for the client to hang up; WebSocket pings are answered, other input ignored."""
+        if not client.websocket:
+            while await reader.read(4096):
+                pass
+            return
+        while True:
+            head = await reader.readexactly(2)
+            opcode, n = head[0] & 0x0F, head[1] & 0x7F
+            if n == 126:
+                n, = struct.unpack("!H", await reader.readexactly(2))
+            elif n == 127:
+                n, = struct.unpack("!Q", await reader.readexactly(8))
+            mask = await reader.readexactly(4) if head[1] & 0x80 else b"\0\0\0\0"
+            payload = bytes(b ^ mask[i % 4] for i, b in enumerate(await reader.readexactly(n)))
+            if opcode == 0x8:  # close
+                client.writer.write(b"\x88\x00")
+                return
+            if opcode == 0x9:  # ping -> pong
+                client.writer.write(struct.pack("!BB", 0x8A, len(payload)) + payload)
+
+    async def _ws_handshake(self, reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 5.0)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            return False
+        headers = {}
+        for line in request.decode("latin-1").split("\r\n")[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        key = headers.get("sec-websocket-key")
+        if key is None:
+            writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n")
+            return False
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\n"
+                      "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+        return True
+
+
+if __name__ == "__main__":
+    # Minimal TCP viewer: one line per frame
+    parser = argparse.ArgumentParser(description="Print frames from a running telemetry server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with socket.create_connection((args.host, args.port)) as sock:
+        for line in sock.makefile("rb"):
+            frame = json.loads(line)
+            queues = " ".join(f"{d}:{lane['queue']}" for d, lane in frame["lanes"].items())
+            lights = " ".join(f"{d}:{s}" for d, s in frame["lights"].items())
+            print(f"t={frame['sim_time']:8.1f}s  {lights}  queues {queues}")
@@ -0,0 +1,141 @@
+# tournament.py
+
+import argparse
+import itertools
+import math
+import multiprocessing
+import os
+import statistics
+import time
+
+from adaptive_controller import AdaptiveController
+from autonomous_controller import AutonomousController
+from game_modes import AutomaticMode, ScenarioChallengeMode
+from simulation import SimulationEngine
+
+# name -> (controller class, constructor kwargs)
+CONTROLLERS = {
+    "adaptive": (AdaptiveController, {}),
+    "adaptive-short": (AdaptiveController, {"base_green": 3, "green_per_vehicle": 0.5, "max_green": 10}),
+    "adaptive-long": (AdaptiveController, {"base_green": 8, "green_per_vehicle": 1.5, "max_green": 25}),
+    "fixed": (AutonomousController, {}),  # 5 s green / 3 s switch
+}
+
+SCENARIOS = {
+    "steady": AutomaticMode,
+    "rush-hour": ScenarioChallengeMode,
+}
+
+# Demand level -> (min, max) seconds between spawns
+DEMANDS = {
+    "low": (2.0, 4.5),
+    "normal": (1.2, 3.0),
+    "high": (0.6, 1.5),
+}
+
+
+def run_one(task):
+    """Run one headless simulation. Top-level so worker processes can pickle it."""
+    controller, scenario, demand, seed, duration = task
+
+    controller_cls, controller_kwargs = CONTROLLERS[controller]
+    engine = SimulationEngine(
+        mode_cls=SCENARIOS[scenario],
+        controller_cls=controller_cls,
+        controller_kwargs=controller_kwargs,
+        vehicle_manager_kwargs={"spawn_interval": DEMANDS[demand]},
+        seed=seed,
+    )
+    engine.run(duration)
+
+    vm = engine.vehicle_manager
+    return {
+        "controller": controller,
+        "scenario": scenario,
+        "demand": demand,
+        "seed": seed,
+        "throughput": vm.exited * 3600.0 / duration,  # vehicles per hour
+        "max_queue": engine.metrics.max_queue_length,
+        "waits": vm.exit_waits,
+    }
+
+
+def run_tournament(controllers, scenarios, demands, seeds, duration, workers=None):
+    tasks = [
+        (c, s, d, seed, duration)
+        for c, s, d, seed in itertools.product(controllers, scenarios, demands, seeds)
+    ]
+    if workers == 1:
+        return [run_one(t) for t in tasks]
+    with multiprocessing.Pool(workers) as pool:
+        return list(pool.imap_unordered(run_one, tasks, chunksize=1))
+
+
+def mean_ci(values, z=1.96):
+    """Mean and half-width of a normal-approximation 95% confidence interval."""
+    mean = statistics.fmean(values)
+    if len(values) < 2:
+        return mean, 0.0
+    return mean, z * statistics.stdev(values) / math.sqrt(len(values))
+
+
+def summarize(results):
+    groups = {}
+    for r in results:
+        groups.setdefault((r["controller"], r["scenario"], r["demand"]), []).append(r)
+
+    rows = []
+    for (controller, scenario, demand), runs in sorted(groups.items()):
+        waits = [w for r in runs for w in r["waits"]]
+        per_run_wait = [statistics.fmean(r["waits"]) if r["waits"] else 0.0 for r in runs]
+        if len(waits) >= 2:
+            deciles = statistics.quantiles(waits, n=10)
+            p50, p90 = deciles[4], deciles[8]
+        else:
+            p50 = p90 = waits[0] if waits else 0.0
+        rows.append({
+            "controller": controller,
+            "scenario": scenario,
+            "demand": demand,
+            "runs": len(runs),
+            "throughput": mean_ci([r["throughput"] for r in runs]),
+            "max_queue": mean_ci([r["max_queue"] for r in runs]),
+            "mean_wait": mean_ci(per_run_wait),
+            "wait_p50": p50,
+            "wait_p90": p90,
+        })
+    return rows
+
+
+def format_table(rows):
+    header = f"{'controller':<15}{'scenario':<11}{'demand':<8}{'runs':>5}" \
+             f"{'veh/h':>16}{'max queue':>14}{'mean wait s':>15}{'p50':>7}{'p90':>7}"
+    lines = [header, "-" * len(header)]
+    for r in rows:
+        lines.append(
+            f"{r['controller']:<15}{r['scenario']:<11}{r['demand']:<8}{r['runs']:>5}"
+            f"{r['throughput'][0]:>9.1f} ±{r['throughput'][1]:>5.1f}"
+            f"{r['max_queue'][0]:>8.1f} ±{r['max_queue'][1]:>4.1f}"
+            f"{r['mean_wait'][0]:>9.2f} ±{r['mean_wait'][1]:>4.2f}"
+            f"{r['wait_p50']:>7.1f}{r['wait_p90']:>7.1f}"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monte Carlo controller tournament (headless, multi-process).")
+    parser.add_argument("--controllers", nargs="+", choices=sorted(CONTROLLERS), default=sorted(CONTROLLERS))
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=sorted(SCENARIOS))
+    parser.add_argument("--demands", nargs="+", choices=list(DEMANDS), default=list(DEMANDS))
+    parser.add_argument("--seeds", type=int, default=10, help="runs per combination")
+    parser.add_argument("--duration", type=float, default=600.0, help="simulated seconds per run")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    wall_start = time.perf_counter()
+    results = run_tournament(args.controllers, args.scenarios, args.demands,
+                             range(args.seeds), args.duration, args.workers)
+    wall = time.perf_counter() - wall_start
+
+    print(format_table(summarize(results)))
+    print(f"\n{len(results)} runs in {wall:.1f}s on {args.workers} workers")
@@ -1,7 +1,12 @@
-import pygame
+import itertools
 import random
 import math
-import os
+import time
+from collections import deque
+
+from geometry import Rect
+from spatial_hash import SpatialHash
+from sim_clock import SimClock
 
 # Vehicle Types and Colors
 # We now map these to asset folders
@@ -15,161 +20,144 @@ VEHICLE_TYPES = {
     "Ambulance": {"folder": "Truck",   "length": 55, "speed": 230, "priority": True} # Emergency Vehicle
 }
 
-# Cache for loaded images
-SPRITE_CACHE = {}
-
-def load_sprites():
-    if SPRITE_CACHE:
-        return
-    
-    base_path = "assets"
-    colors = ["blue", "green", "red", "gray", "cream", "white", "black", "yellow"]
-    
-    for type_name, specs in VEHICLE_TYPES.items():
-        folder = specs.get("folder")
-        if not folder: continue
-        
-        path = os.path.join(base_path, folder)
-        if not os.path.exists(path):
-            continue
-            
-        SPRITE_CACHE[type_name] = {}
-        
-        # Try to find images
-        for f in os.listdir(path):
-            if f.endswith(".png"):
-                # assume format: type_color.png
-                # e.g. sedan_blue.png
-                # Extract color
-                parts = f.split('_')
-                if len(parts) > 1:
-                    color = parts[1].replace(".png", "")
-                    img = pygame.image.load(os.path.join(path, f)).convert_alpha()
-                    
-                    # Assume original sprites are facing UP (or adjust here)
-                    # We will resize them to standard width/length (~20x40)
-                    # Adjust scale based on specs
-                    
-                    # Rotate 180 if original assets are facing DOWN? 
-                    # Usually top-down assets face DOWN or UP.
-                    # We'll rotate them to point UP (0 degrees) as canonical.
-                    # Let's assume they face DOWN by default if they are from common packs.
-                    # But if they face UP, we keep as is.
-                    # We'll assume UP for now.
-                    
-                    # Resize
-                    w, h = img.get_size()
-                    # Aspect ratio
-                    target_w = 24
-                    target_h = specs["length"]
-                    img = pygame.transform.scale(img, (target_w, target_h))
-                    
-                    SPRITE_CACHE[type_name][color] = img
+# Lanes per approach.
+# Road width 220. Half 110. Center 0.
+# RHT:
+# N (Southbound): Lane 1 (Normal) near Center. Lane 2 (Emergency) at Far Right (West edge).
+# S (Northbound): Lane 1 (Normal) near Center. Lane 2 (Emergency) at Far Right (East edge).
+# E (Westbound): Lane 1 (Normal) near Center. Lane 2 (Emergency) at Far Right (North edge).
+# W (Eastbound): Lane 1 (Normal) near Center. Lane 2 (Emergency) at Far Right (South edge).
+LANES = ["main", "shoulder"]
+LANE_OFFSETS = {
+    # approach: {lane: (dx, dy) relative to the approach start}
+    "N": {"main": (25, 0), "shoulder": (-35, 0)},   # Right/Inner, Left/Outer
+    "S": {"main": (-25, 0), "shoulder": (35, 0)},   # Left/Inner, Right/Outer
+    "E": {"main": (0, 25), "shoulder": (0, -35)},   # Bottom/Inner, Top/Outer
+    "W": {"main": (0, -25), "shoulder": (0, 35)},   # Top/Inner, Bottom/Outer
+}
+
+# Unit direction of travel per approach
+TRAVEL_DIR = {"N": (0, 1), "S": (0, -1), "E": (-1, 0), "W": (1, 0)}
+
+
+def lane_start(road_info, approach, lane):
+    """Spawn point (x, y) of a lane."""
+    start_x, start_y = road_info["starts"][approach]
+    dx, dy = LANE_OFFSETS[approach][lane]
+    return start_x + dx, start_y + dy
+
+
+# Per-type constants, computed once: (length, max speed, priority)
+TYPE_SPECS = {name: (specs["length"], specs["speed"], specs.get("priority", False))
+              for name, specs in VEHICLE_TYPES.items()}
+RANDOM_TYPES = [k for k in VEHICLE_TYPES if k != "Ambulance"]  # Ambulances are spawned on purpose
+VEHICLE_WIDTH = 24
+
+# Colors with a sprite per type, in load order. Filled by renderer.load_sprites()
+# when there is a display; vehicles only pick a color from here, so headless
+# runs (empty table) draw no color at all.
+SPRITE_COLORS = {}
+
+# Headings are in degrees counter-clockwise from UP (sprites face UP)
+APPROACH_HEADING = {"N": 180, "S": 0, "E": 90, "W": 270}
+
 
 class Vehicle:
-    def __init__(self, vehicle_id, approach, road_info, is_ambulance=False):
-        # Load sprites if not loaded
-        load_sprites()
-        
+    # Fixed attribute set: smaller instances, and VehicleManager recycles them through reset()
+    __slots__ = ("id", "approach", "road_info", "is_ambulance", "spawn_time", "type_name",
+                 "length", "max_speed", "is_vip", "speed", "state", "wait_time", "stopped",
+                 "stops", "crossed", "color_name", "lane", "x", "y",
+                 "leader", "follower", "rect", "heading", "admission")
+
+    width = VEHICLE_WIDTH  # Standard width for sprite
+
+    def __init__(self, vehicle_id, approach, road_info, is_ambulance=False, spawn_time=None,
+                 rng=None, type_name=None, color_name=None, position=None):
+        self.rect = Rect(0, 0, VEHICLE_WIDTH, 0)
+        self.reset(vehicle_id, approach, road_info, is_ambulance, spawn_time, rng, type_name, color_name, position)
+
+    def reset(self, vehicle_id, approach, road_info, is_ambulance=False, spawn_time=None,
+              rng=None, type_name=None, color_name=None, position=None):
+        """(Re)initialise as a new vehicle; same arguments as the constructor.
+
+        rng: a random.Random stream for reproducible runs (module random otherwise).
+        type_name / color_name: fixed choices, e.g. when replaying a recording.
+        position: lane start (x, y) if the caller already has it.
+        """
+        rng = rng or random
+
         self.id = vehicle_id
         self.approach = approach  # "N", "S", "E", "W" (where I am coming FROM)
         self.road_info = road_info
         self.is_ambulance = is_ambulance
-        self.spawn_time = pygame.time.get_ticks() / 1000.0 # Track creation time
-        
+        if spawn_time is None:
+            spawn_time = time.monotonic()
+        self.spawn_time = spawn_time # Track creation time
+
         if is_ambulance:
             self.type_name = "Ambulance"
+        elif type_name is not None:
+            self.type_name = type_name
         else:
-            # exclude Ambulance from random choice
-            choices = [k for k in VEHICLE_TYPES.keys() if k != "Ambulance"]
-            self.type_name = random.choice(choices)
-            
-        specs = VEHICLE_TYPES[self.type_name]
-        
-        self.length = specs["length"]
-        self.max_speed = specs["speed"] 
-        self.width = 24 # Standard width for sprite
-        self.is_vip = specs.get("priority", False)
-        
+            self.type_name = rng.choice(RANDOM_TYPES)
+
+        self.length, self.max_speed, self.is_vip = TYPE_SPECS[self.type_name]
+
         self.speed = self.max_speed
-        self.state = "moving" 
-        
-        # Pick sprite
-        available_colors = list(SPRITE_CACHE.get(self.type_name, {}).keys())
+        self.state = "moving"
+        self.wait_time = 0.0 # Seconds spent below STOPPED_SPEED
+        self.stopped = False # Currently below STOPPED_SPEED
+        self.stops = 0       # Times it came to a stop
+        self.crossed = False # Passed its stop line
+
+        # Pick a sprite color (the renderer looks the sprite up by type, color and heading)
+        available_colors = SPRITE_COLORS.get(self.type_name)
         if available_colors:
-            if self.is_ambulance:
+            if color_name in available_colors:
+                self.color_name = color_name
+            elif self.is_ambulance:
                 # Try to pick a white or cream truck if available, else random
                 if "cream" in available_colors: self.color_name = "cream"
                 elif "white" in available_colors: self.color_name = "white"
-                else: self.color_name = random.choice(available_colors)
+                else: self.color_name = rng.choice(available_colors)
             else:
-                self.color_name = random.choice(available_colors)
-            self.original_image = SPRITE_CACHE[self.type_name][self.color_name]
+                self.color_name = rng.choice(available_colors)
         else:
-            self.original_image = None
-            self.color = (255, 0, 0) # Fallback
-
-        # Initial position
-        # Road width 220. Half 110. Center 0.
-        # RHT: 
-        # N (Southbound): Lane 1 (Normal) near Center. Lane 2 (Emergency) at Far Right (West edge).
-        # S (Northbound): Lane 1 (Normal) near Center. Lane 2 (Emergency) at Far Right (East edge).
-        # E (Westbound): Lane 1 (Normal) near Center. Lane 2 (Emergency) at Far Right (North edge).
-        # W (Eastbound): Lane 1 (Normal) near Center. Lane 2 (Emergency) at Far Right (South edge).
-        
-        start_x, start_y = road_info["starts"][approach]
-        
-        # Lane offsets relative to start center
-        if approach == "N":
-            if self.is_ambulance: self.x = start_x - 35 # Left/Outer (Shoulder)
-            else: self.x = start_x + 25 # Right/Inner (Main)
-            self.y = start_y
-            
-        elif approach == "S":
-            if self.is_ambulance: self.x = start_x + 35 # Right/Outer (Shoulder)
-            else: self.x = start_x - 25 # Left/Inner (Main)
-            self.y = start_y
-            
-        elif approach == "E":
-            self.x = start_x
-            if self.is_ambulance: self.y = start_y - 35 # Top/Outer
-            else: self.y = start_y + 25 # Bottom/Inner
-            
-        elif approach == "W":
-            self.x = start_x
-            if self.is_ambulance: self.y = start_y + 35 # Bottom/Outer
-            else: self.y = start_y - 25 # Top/Inner
-        
-        self.rect = pygame.Rect(0, 0, self.width, self.length)
-        self.image = self.original_image
+            self.color_name = color_name
+
+        # Initial position: ambulances use the shoulder lane
+        self.lane = "shoulder" if self.is_ambulance else "main"
+        if position is None:
+            position = lane_start(road_info, approach, self.lane)
+        self.x, self.y = position
+
+        # Neighbours in the same lane queue, kept by VehicleManager
+        self.leader = None
+        self.follower = None
+
+        # Orientation based on approach (original image faces UP)
+        self.set_heading(APPROACH_HEADING[approach])
+
+    def set_heading(self, heading):
+        """Set the heading and the rect to the rotated sprite's bounding box; only needed when heading changes."""
+        self.heading = heading
+        a = math.radians(heading)
+        c, s = abs(math.cos(a)), abs(math.sin(a))
+        self.rect.size = (round(self.width * c + self.length * s), round(self.width * s + self.length * c))
         self.update_rect()
 
     def update_rect(self):
-        # Orientation based on approach
-        # Assume original image faces UP
-        
-        rotation = 0
-        if self.approach == "N": # From Top (Moving Down) -> Face Down
-            rotation = 180
-        elif self.approach == "S": # From Bottom (Moving Up) -> Face Up
-            rotation = 0
-        elif self.approach == "E": # From Right (Moving Left) -> Face Left
-            rotation = 90
-        elif self.approach == "W": # From Left (Moving Right) -> Face Right
-            rotation = -90
-            
-        if self.original_image:
-            self.image = pygame.transform.rotate(self.original_image, rotation)
-            self.rect = self.image.get_rect()
-        else:
-            if self.approach in ["N", "S"]:
-                self.rect.size = (self.width, self.length)
-            else:
-                self.rect.size = (self.length, self.width)
-        
-        self.rect.center = (self.x, self.y)
+        # rect.center = (x, y), inlined: this runs for every vehicle every tick
+        rect = self.rect
+        rect.x = int(self.x) - rect.w // 2
+        rect.y = int(self.y) - rect.h // 2
+
+    def progress(self):
+        """Distance travelled along the direction of travel (larger = further ahead)."""
+        dx, dy = TRAVEL_DIR[self.approach]
+        return self.x * dx + self.y * dy
 
-    def move(self, dt, vehicle_ahead, stop_line_pos, light_state, all_vehicles=None):
+    def move(self, dt, vehicle_ahead, stop_line_pos, light_state, all_vehicles=None, spatial_index=None):
         target_speed = self.max_speed
         
         # Ambulance ignores red lights? Or just stops if blocked?
@@ -214,21 +202,26 @@ class Vehicle:
                     target_speed = min(target_speed, vehicle_ahead.speed)
 
         # Cross-traffic collision avoidance (Ambulances)
-        if self.is_ambulance and all_vehicles:
+        if self.is_ambulance and (all_vehicles or spatial_index):
             # Define a safety box ahead
             safety_dist = 100 # Increased from 80 to prevent visual clipping
             box = None
             if self.approach == "N": 
-                box = pygame.Rect(self.x - 15, self.y + self.length/2, 30, safety_dist)
+                box = Rect(self.x - 15, self.y + self.length/2, 30, safety_dist)
             elif self.approach == "S":
-                box = pygame.Rect(self.x - 15, self.y - self.length/2 - safety_dist, 30, safety_dist)
+                box = Rect(self.x - 15, self.y - self.length/2 - safety_dist, 30, safety_dist)
             elif self.approach == "E":
-                box = pygame.Rect(self.x - self.length/2 - safety_dist, self.y - 15, safety_dist, 30)
+                box = Rect(self.x - self.length/2 - safety_dist, self.y - 15, safety_dist, 30)
             elif self.approach == "W":
-                box = pygame.Rect(self.x + self.length/2, self.y - 15, safety_dist, 30)
+                box = Rect(self.x + self.length/2, self.y - 15, safety_dist, 30)
             
             if box:
-                for other in all_vehicles:
+                candidates = all_vehicles
+                if spatial_index is not None:
+                    # Index was built at the start of the tick; pad for movement since
+                    pad = index_padding(dt)
+                    candidates = spatial_index.query_rect(box.inflate(pad * 2, pad * 2))
+                for other in candidates:
                     if other is self: continue
                     if box.colliderect(other.rect):
                         target_speed = 0
@@ -291,139 +284,307 @@ class Vehicle:
             
         self.update_rect()
 
-    def draw(self, surface):
-        if self.original_image and self.image:
-             surface.blit(self.image, self.rect)
-             # Draw separate indicator for ambulance if needed
-             if self.is_ambulance:
-                 # Blinking light?
-                 if (pygame.time.get_ticks() // 200) % 2 == 0:
-                     pygame.draw.circle(surface, (255, 50, 50), self.rect.center, 8)
-                 else:
-                     pygame.draw.circle(surface, (50, 50, 255), self.rect.center, 8)
-        else:
-            pygame.draw.rect(surface, self.color or (200,200,200), self.rect, border_radius=4)
+
+# Fastest a vehicle can go: move() caps speed at 1.5x the type's max_speed
+MAX_STEP_SPEED = 1.5 * max(speed for _, speed, _ in TYPE_SPECS.values())
+
+
+def index_padding(dt):
+    """How far a box must be padded to catch vehicles indexed at the start of a dt tick.
+
+    The index holds whole vehicle boxes, so this only covers the distance
+    moved since (plus a pixel for int truncation); about 7 px at 60 fps,
+    35 px at a 0.1 s network step.
+    """
+    return math.ceil(MAX_STEP_SPEED * dt) + 1
+
+# Below this speed (px/s) a vehicle counts as waiting
+STOPPED_SPEED = 5.0
+
+# Stamps every entry of a vehicle into a manager (VehicleManager._add)
+_admissions = itertools.count()
+
+
+class ApproachStats:
+    """Running counters for one approach, kept current by VehicleManager as vehicles change state."""
+
+    def __init__(self):
+        self.queued = 0         # Vehicles that have not crossed the stop line yet
+        self.stopped = 0        # ... of which are currently stopped
+        self.total_wait = 0.0   # Seconds waited by this approach's vehicles so far
+        # (vehicle, admission) of uncrossed vehicles in spawn order; crossed ones
+        # are dropped lazily, and a changed admission spots entries whose vehicle
+        # has since left (recycled, or handed on to another intersection)
+        self.waiting = deque()
+
+    def oldest_spawn_time(self):
+        """Spawn time of the longest-waiting uncrossed vehicle, or None."""
+        waiting = self.waiting
+        while waiting and (waiting[0][0].crossed or waiting[0][0].admission != waiting[0][1]):
+            waiting.popleft()
+        return waiting[0][0].spawn_time if waiting else None
 
 
 class VehicleManager:
-    def __init__(self, road_info):
+    def __init__(self, road_info, spawn_interval=(1.2, 3.0), clock=None, rng=None,
+                 vehicle_rng=None, recorder=None, replay=None,
+                 spawn_directions=("N", "S", "E", "W"), on_exit=None):
+        """
+        clock: shared SimClock advanced by the driver. Without one the manager
+               keeps a private clock and advances it in update().
+        rng: random.Random for the spawn schedule (module random otherwise).
+        vehicle_rng: random.Random for vehicle type/color (defaults to rng).
+        recorder / replay: replay.Recording to log spawns into, or to take
+               spawns from instead of rolling for them.
+        spawn_directions: approaches that get new traffic (empty: none, e.g.
+               an intersection inside a network fed only by its neighbours).
+        on_exit: called with each vehicle that leaves the area. Without one,
+               exited vehicles are recycled for later spawns.
+        """
         self.vehicles = {
             "N": [], "S": [], "E": [], "W": []
         }
+        # Per-lane queues ordered front (index 0) to back, with leader/follower links
+        self.lanes = {(d, lane): [] for d in self.vehicles for lane in LANES}
+        self.stats = {d: ApproachStats() for d in self.vehicles}
         self.road_info = road_info
         self.spawn_timer = 0.5 # Start fast
+        self.spawn_interval = spawn_interval # (min, max) seconds between spawns
         self.next_id = 0
+        self.owns_clock = clock is None
+        self.clock = clock or SimClock()
+        self.rng = rng or random
+        self.vehicle_rng = vehicle_rng or self.rng
+        self.recorder = recorder
+        self.replay = replay
+        self.spawn_directions = list(spawn_directions)
+        self.on_exit = on_exit
+        self.arrivals = []      # Vehicles handed over by receive(), waiting for a clear entry
+        self.pool = []          # Exited vehicles ready for reuse by spawn_vehicle()
+        self.released = []      # Exited this update; pooled on the next one, after Metrics read the events
+        # Lane start (x, y) per (approach, lane), shared by spawning and arrivals
+        self.entry_points = {(d, lane): lane_start(road_info, d, lane)
+                             for d in road_info["starts"] for lane in LANES}
+        self.exited = 0         # Vehicles that left the area
+        self.exit_waits = []    # wait_time of each exited vehicle
+        # (kind, vehicle) raised during the last update() (spawns in between
+        # included); kind is "spawn", "stop", "cross" or "exit". Read by Metrics.
+        self.events = []
+        stops = road_info["stop_lines"]
+        # Stop line as a progress() value per approach
+        self.stop_progress = {d: stops[d] * (TRAVEL_DIR[d][0] + TRAVEL_DIR[d][1]) for d in stops}
+        # Uniform grid over all vehicles, rebuilt once per tick
+        self.spatial_index = SpatialHash(cell_size=64)
+
+    @property
+    def current_time(self):
+        return self.clock.now
 
     def get_lane_info(self, direction):
-        """Returns (queue_length, max_wait_time) for the given lane."""
-        lane = self.vehicles[direction]
-        if not lane:
+        """Returns (queue_length, max_wait_time) for the given lane.
+
+        Only vehicles still before the stop line count; both values are
+        read from the running ApproachStats, no scan.
+        """
+        stats = self.stats[direction]
+        oldest = stats.oldest_spawn_time()
+        if oldest is None:
             return 0, 0
-            
-        queue_length = len(lane)
-        
-        # Max wait time is current time - spawn time of the OLDEST car (index 0)
-        current_time = pygame.time.get_ticks() / 1000.0
-        max_wait = current_time - lane[0].spawn_time
-        
-        return queue_length, max_wait
+        return stats.queued, self.current_time - oldest
 
     def update(self, dt, light_states):
-        self.spawn_timer -= dt
-        if self.spawn_timer <= 0:
-            direction = random.choice(["N", "S", "E", "W"])
-            
-            # 10% chance of Ambulance
-            is_ambulance = random.random() < 0.1
-            
-            self.spawn_vehicle(direction, is_ambulance)
-            self.spawn_timer = random.uniform(1.2, 3.0) 
+        if self.owns_clock:
+            self.clock.advance(dt)
+        self.events = []
+        events = self.events
+        if self.released:
+            self.pool += self.released
+            self.released = []
+
+        if self.replay is not None:
+            # Spawns come from the recording, exactly as they happened
+            for direction, is_ambulance, type_name, color_name in self.replay.due(self.clock.frame, "spawn"):
+                self.spawn_vehicle(direction, is_ambulance, type_name, color_name, force=True)
+        elif self.spawn_directions:
+            self.spawn_timer -= dt
+            if self.spawn_timer <= 0:
+                direction = self.rng.choice(self.spawn_directions)
+                
+                # 10% chance of Ambulance
+                is_ambulance = self.rng.random() < 0.1
+                
+                self.spawn_vehicle(direction, is_ambulance)
+                self.spawn_timer = self.rng.uniform(*self.spawn_interval)
+
+        if self.arrivals:
+            self._admit_arrivals()
+
+        # Index every vehicle once for cross-checking (ambulance safety box)
+        index = self.spatial_index
+        index.clear()
+        for lane in self.vehicles.values():
+            for v in lane:
+                r = v.rect
+                index.insert(v, (r.x, r.y, r.w, r.h))
 
         for direction, lane_vehicles in self.vehicles.items():
+            if not lane_vehicles:
+                continue
             stop_line = self.road_info["stop_lines"][direction]
+            stop_progress = self.stop_progress[direction]
+            stats = self.stats[direction]
             
             # Normal light logic (no global override)
             light = light_states.get(direction, "red") 
-            
-            # Flatten list of all vehicles for cross-checking
-            all_vehicles_list = [v for l in self.vehicles.values() for v in l]
 
             # Filter out distant vehicles
             active_vehicles = []
-            for i, vehicle in enumerate(lane_vehicles):
-                # Check for vehicle ahead ONLY in same lane
-                vehicle_ahead = None
-                
-                # Check specifically for same-lane predecessor
-                # This is O(N^2) worst case but N is small per lane.
-                # Since list is ordered by spawn, previous cars are always 'ahead' in array index unless overtaking happens (not here).
-                # We just need to find the nearest one in same lane.
-                
-                # Heuristic: just check the last few? No, linear scan backwards is fine.
-                for j in range(i-1, -1, -1):
-                    other = lane_vehicles[j]
-                    # Check lane alignment
-                    lat_dist = 0
-                    if direction in ["N", "S"]: lat_dist = abs(vehicle.x - other.x)
-                    else: lat_dist = abs(vehicle.y - other.y)
-                    
-                    if lat_dist < 20: # Same lane
-                        vehicle_ahead = other
-                        break
-                
-                vehicle.move(dt, vehicle_ahead, stop_line, light, all_vehicles=all_vehicles_list)
+            for vehicle in lane_vehicles:
+                # Leader in the same lane is maintained by the lane queues
+                vehicle.move(dt, vehicle.leader, stop_line, light, spatial_index=index)
+                if vehicle.speed < STOPPED_SPEED:
+                    vehicle.wait_time += dt
+                    stats.total_wait += dt
+                    if not vehicle.stopped:
+                        vehicle.stopped = True
+                        vehicle.stops += 1
+                        if not vehicle.crossed:
+                            stats.stopped += 1
+                        events.append(("stop", vehicle))
+                elif vehicle.stopped:
+                    vehicle.stopped = False
+                    if not vehicle.crossed:
+                        stats.stopped -= 1
+                if not vehicle.crossed and vehicle.progress() > stop_progress:
+                    self._mark_crossed(vehicle, stats)
+                    events.append(("cross", vehicle))
                 
                 # Check bounds (keep if within reasonable area)
                 # W=1000, H=700
                 if -200 < vehicle.x < 1200 and -200 < vehicle.y < 900:
                     active_vehicles.append(vehicle)
+                else:
+                    if not vehicle.crossed:
+                        self._mark_crossed(vehicle, stats)
+                    self._unlink(vehicle)
+                    self.exited += 1
+                    self.exit_waits.append(vehicle.wait_time)
+                    events.append(("exit", vehicle))
+                    if self.on_exit is not None:
+                        self.on_exit(vehicle)
+                    else:
+                        self.released.append(vehicle)
             
             self.vehicles[direction] = active_vehicles
+            for lane in LANES:
+                self._restore_order(self.lanes[(direction, lane)])
 
-    def spawn_vehicle(self, direction, is_ambulance=False):
-        start_x, start_y = self.road_info["starts"][direction]
-        target_x, target_y = start_x, start_y
-        
-        # Consistent offset logic (Must match Vehicle.__init__)
-        if direction == "N":
-            if is_ambulance: target_x = start_x - 35
-            else: target_x = start_x + 25
-        elif direction == "S":
-            if is_ambulance: target_x = start_x + 35
-            else: target_x = start_x - 25
-        elif direction == "E":
-            if is_ambulance: target_y = start_y - 35
-            else: target_y = start_y + 25
-        elif direction == "W":
-            if is_ambulance: target_y = start_y + 35
-            else: target_y = start_y - 25
-            
-        lane = self.vehicles[direction]
-        if lane:
-            safe = True
-            for last_v in reversed(lane):
-                # Lateral check
-                lat_dist = 0
-                if direction in ["N", "S"]: lat_dist = abs(last_v.x - target_x)
-                else: lat_dist = abs(last_v.y - target_y)
-                
-                if lat_dist < 20: # Same lane collision check
-                    long_dist = 0
-                    if direction in ["N", "S"]: long_dist = abs(last_v.y - target_y)
-                    else: long_dist = abs(last_v.x - target_x)
-                    
-                    if long_dist < 80:
-                        safe = False
-                        break
-                if not safe: break
-            
-            if not safe: return
+    def _mark_crossed(self, vehicle, stats):
+        vehicle.crossed = True
+        stats.queued -= 1
+        if vehicle.stopped:
+            stats.stopped -= 1
+
+    def _unlink(self, vehicle):
+        """Remove a vehicle from its lane queue, joining its neighbours."""
+        self.lanes[(vehicle.approach, vehicle.lane)].remove(vehicle)
+        if vehicle.leader is not None:
+            vehicle.leader.follower = vehicle.follower
+        if vehicle.follower is not None:
+            vehicle.follower.leader = vehicle.leader
+        vehicle.leader = vehicle.follower = None
 
-        new_vehicle = Vehicle(self.next_id, direction, self.road_info, is_ambulance)
-        self.vehicles[direction].append(new_vehicle)
+    def _restore_order(self, queue):
+        """Re-sort a lane queue after an overtake and relink its neighbours."""
+        for i in range(1, len(queue)):
+            if queue[i].progress() > queue[i - 1].progress():
+                break
+        else:
+            return
+        queue.sort(key=lambda v: v.progress(), reverse=True)
+        prev = None
+        for v in queue:
+            v.leader = prev
+            v.follower = None
+            if prev is not None:
+                prev.follower = v
+            prev = v
+
+    def vehicles_near(self, x, y, radius):
+        """Vehicles within radius of (x, y), as of the last update."""
+        return self.spatial_index.query_radius(x, y, radius)
+
+    def _entry_clear(self, direction, lane, target_x, target_y):
+        # Only the last vehicle of the lane can block the entry point
+        queue = self.lanes[(direction, lane)]
+        if not queue:
+            return True
+        tail = queue[-1]
+        long_dist = 0
+        if direction in ["N", "S"]: long_dist = abs(tail.y - target_y)
+        else: long_dist = abs(tail.x - target_x)
+        return long_dist >= 80
+
+    def _add(self, vehicle):
+        """Append a vehicle to the back of its lane and count it in."""
+        direction = vehicle.approach
+        queue = self.lanes[(direction, vehicle.lane)]
+        if queue:
+            vehicle.leader = queue[-1]
+            queue[-1].follower = vehicle
+        queue.append(vehicle)
+        self.vehicles[direction].append(vehicle)
+        stats = self.stats[direction]
+        stats.queued += 1
+        vehicle.admission = next(_admissions)
+        stats.waiting.append((vehicle, vehicle.admission))
+
+    def spawn_vehicle(self, direction, is_ambulance=False, type_name=None, color_name=None, force=False):
+        """Add a vehicle at the lane entry unless the lane is blocked (force skips the check).
+
+        Returns the new vehicle, or None if the entry was blocked.
+        """
+        lane = "shoulder" if is_ambulance else "main"
+        position = self.entry_points[(direction, lane)]
+        if not force and not self._entry_clear(direction, lane, *position):
+            return None
+
+        if self.pool:
+            new_vehicle = self.pool.pop()
+            new_vehicle.reset(self.next_id, direction, self.road_info, is_ambulance, self.current_time,
+                              self.vehicle_rng, type_name, color_name, position)
+        else:
+            new_vehicle = Vehicle(self.next_id, direction, self.road_info, is_ambulance, spawn_time=self.current_time,
+                                  rng=self.vehicle_rng, type_name=type_name, color_name=color_name,
+                                  position=position)
+        if self.recorder is not None:
+            self.recorder.record(self.clock.frame, "spawn", direction, is_ambulance,
+                                 new_vehicle.type_name, new_vehicle.color_name)
+        self._add(new_vehicle)
         self.next_id += 1
+        self.events.append(("spawn", new_vehicle))
+        return new_vehicle
 
-    def draw(self, surface):
-        for lane in self.vehicles.values():
-            for v in lane:
-                v.draw(surface)
+    def receive(self, vehicle):
+        """Take over a vehicle leaving a neighbouring intersection.
+
+        It keeps its approach, lane, speed and accumulated wait, and enters
+        at the lane start on the next update() at which that entry is clear.
+        """
+        self.arrivals.append(vehicle)
+
+    def _admit_arrivals(self):
+        waiting = []
+        for vehicle in self.arrivals:
+            target_x, target_y = self.entry_points[(vehicle.approach, vehicle.lane)]
+            if not self._entry_clear(vehicle.approach, vehicle.lane, target_x, target_y):
+                waiting.append(vehicle)  # Spillback: the link is full up to the entry
+                continue
+            vehicle.x, vehicle.y = target_x, target_y
+            vehicle.update_rect()
+            vehicle.spawn_time = self.current_time
+            vehicle.crossed = False
+            vehicle.stopped = False
+            self._add(vehicle)
+            self.events.append(("spawn", vehicle))
+        self.arrivals = waiting
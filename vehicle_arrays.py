@@ -0,0 +1,358 @@
+# vehicle_arrays.py
+
+import random
+from collections import namedtuple
+
+import numpy as np
+
+from vehicle import VEHICLE_TYPES, LANE_OFFSETS as VEHICLE_LANE_OFFSETS, STOPPED_SPEED
+from sim_clock import SimClock
+
+# Approach codes and their unit direction of travel (x, y)
+APPROACHES = ["N", "S", "E", "W"]
+APPROACH_CODE = {d: i for i, d in enumerate(APPROACHES)}
+DIR_X = np.array([0.0, 0.0, -1.0, 1.0])
+DIR_Y = np.array([1.0, -1.0, 0.0, 0.0])
+
+# Light state codes, indexed per approach each step
+LIGHT_CODE = {"green": 0, "yellow": 1, "red": 2, "red_yellow": 3}
+
+# Lanes: 0 = main (inner), 1 = shoulder (ambulances)
+MAIN_LANE, SHOULDER_LANE = 0, 1
+
+# Lateral offset of each lane from the approach start, (main, shoulder)
+LANE_OFFSETS = {d: (lanes["main"], lanes["shoulder"]) for d, lanes in VEHICLE_LANE_OFFSETS.items()}
+
+TYPE_NAMES = list(VEHICLE_TYPES.keys())
+TYPE_CODE = {name: i for i, name in enumerate(TYPE_NAMES)}
+TYPE_LENGTH = np.array([VEHICLE_TYPES[n]["length"] for n in TYPE_NAMES], dtype=np.float64)
+TYPE_SPEED = np.array([VEHICLE_TYPES[n]["speed"] for n in TYPE_NAMES], dtype=np.float64)
+TYPE_COLORS = [
+    (90, 140, 255), (80, 200, 120), (150, 150, 160), (220, 80, 60),
+    (240, 200, 60), (200, 120, 240), (240, 240, 240),
+]
+
+VEHICLE_WIDTH = 24
+
+# What an event in ArrayVehicleManager.events carries: the Vehicle attributes Metrics reads
+VehicleRecord = namedtuple("VehicleRecord", "id approach wait_time stops")
+
+
+class VehicleArrays:
+    """Structure-of-arrays vehicle store.
+
+    One NumPy array per attribute; the first `count` slots are live.
+    Capacity doubles when full and removals compact the arrays in place.
+    """
+
+    FIELDS = {
+        "id": np.int64,
+        "x": np.float64,
+        "y": np.float64,
+        "speed": np.float64,
+        "length": np.float64,
+        "max_speed": np.float64,
+        "spawn_time": np.float64,
+        "approach": np.int8,
+        "lane": np.int8,
+        "type": np.int8,
+        "ambulance": np.bool_,
+        "wait": np.float64,     # Seconds spent below STOPPED_SPEED
+        "stops": np.int16,      # Times it came to a stop
+        "stopped": np.bool_,
+        "crossed": np.bool_,    # Passed its stop line
+    }
+
+    def __init__(self, capacity=64):
+        self.count = 0
+        self.capacity = capacity
+        for name, dtype in self.FIELDS.items():
+            setattr(self, "_" + name, np.zeros(capacity, dtype=dtype))
+
+    def __len__(self):
+        return self.count
+
+    def __getattr__(self, name):
+        # store.x, store.speed, ... -> live slice of the backing array
+        if name in VehicleArrays.FIELDS:
+            return self.__dict__["_" + name][:self.count]
+        raise AttributeError(name)
+
+    def _grow(self):
+        self.capacity *= 2
+        for name in self.FIELDS:
+            old = getattr(self, "_" + name)
+            new = np.zeros(self.capacity, dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, "_" + name, new)
+
+    def append(self, **values):
+        if self.count == self.capacity:
+            self._grow()
+        i = self.count
+        # Slots past count hold whatever keep() left there; reset the fields not given
+        for name in self.FIELDS:
+            getattr(self, "_" + name)[i] = values.get(name, 0)
+        self.count += 1
+        return i
+
+    def keep(self, mask):
+        """Drop every live slot where mask is False, preserving order."""
+        idx = np.flatnonzero(mask)
+        n = len(idx)
+        if n == self.count:
+            return
+        for name in self.FIELDS:
+            arr = getattr(self, "_" + name)
+            arr[:n] = arr[idx]
+        self.count = n
+
+    def progress(self):
+        """Distance travelled along each vehicle's direction of travel."""
+        a = self.approach
+        return self.x * DIR_X[a] + self.y * DIR_Y[a]
+
+    def rects(self):
+        """Axis-aligned (left, top, width, height) of every vehicle."""
+        vertical = self.approach <= APPROACH_CODE["S"]
+        w = np.where(vertical, VEHICLE_WIDTH, self.length)
+        h = np.where(vertical, self.length, VEHICLE_WIDTH)
+        return self.x - w / 2, self.y - h / 2, w, h
+
+
+def step_vehicles(store, dt, stop_progress, light_codes):
+    """Vectorized Vehicle.move for every vehicle in the store.
+
+    stop_progress: per-approach stop line, in progress coordinates.
+    light_codes: per-approach LIGHT_CODE value.
+
+    Reproduces the car-following, ambulance safety box, stop-line,
+    dilemma-zone and acceleration rules of Vehicle.move. The one
+    difference is that every vehicle sees its leader's position from the
+    start of the step, where the object version lets the leader move
+    first.
+    """
+    n = store.count
+    if n == 0:
+        return
+
+    approach = store.approach
+    speed = store.speed
+    max_speed = store.max_speed
+    length = store.length
+    ambulance = store.ambulance
+    progress = store.progress()
+    target = max_speed.copy()
+
+    # --- Car following: leader = next vehicle ahead in the same approach + lane
+    group = approach.astype(np.int64) * 2 + store.lane
+    order = np.lexsort((-progress, group))
+    same_group = np.zeros(n, dtype=bool)
+    same_group[1:] = group[order[1:]] == group[order[:-1]]
+    followers = order[same_group]
+    leaders = order[np.flatnonzero(same_group) - 1]
+
+    gap = progress[leaders] - progress[followers] - (length[followers] + length[leaders]) / 2
+    follow_target = np.where(gap < 20, 0.0,
+                             np.where(gap < 100, np.minimum(target[followers], speed[leaders]),
+                                      target[followers]))
+    target[followers] = follow_target
+
+    # --- Ambulance cross-traffic safety box
+    amb = np.flatnonzero(ambulance)
+    if amb.size:
+        safety_dist = 100
+        ax, ay, alen = store.x[amb], store.y[amb], length[amb]
+        a_app = approach[amb]
+        half = alen / 2
+        # Box ahead of the ambulance, per approach (left, top, width, height)
+        bx = np.select([a_app == 0, a_app == 1, a_app == 2], [ax - 15, ax - 15, ax - half - safety_dist], ax + half)
+        by = np.select([a_app == 0, a_app == 1, a_app == 2], [ay + half, ay - half - safety_dist, ay - 15], ay - 15)
+        vertical = a_app <= 1
+        bw = np.where(vertical, 30, safety_dist)
+        bh = np.where(vertical, safety_dist, 30)
+
+        ox, oy, ow, oh = store.rects()
+        hit = ((bx[:, None] < ox + ow) & (bx[:, None] + bw[:, None] > ox) &
+               (by[:, None] < oy + oh) & (by[:, None] + bh[:, None] > oy))
+        hit[np.arange(amb.size), amb] = False
+        blocked = amb[hit.any(axis=1)]
+        target[blocked] = 0.0
+        speed[blocked] = 0.0  # Instant emergency brake to avoid clipping
+
+    # --- Light logic (ambulances ignore lights)
+    dist_to_line = stop_progress[approach] - progress
+    light = light_codes[approach]
+    in_zone = ~ambulance & (dist_to_line > 0) & (dist_to_line < 220)
+
+    yellow = in_zone & (light == LIGHT_CODE["yellow"])
+    target = np.where(yellow, np.minimum(target, max_speed * 0.45), target)
+    dilemma = (dist_to_line < 50) & (speed > max_speed * 0.5)
+    red = in_zone & (light >= LIGHT_CODE["red"])
+    should_stop = (yellow & ~dilemma) | red
+
+    creep = np.minimum(target, (dist_to_line / 120) * max_speed)
+    target = np.where(should_stop, np.where(dist_to_line < 25, 0.0, creep), target)
+
+    # --- Physics
+    speed += np.where(speed < target, 200 * dt, np.where(speed > target, -400 * dt, 0.0))
+    np.clip(speed, 0, max_speed * 1.5, out=speed)
+
+    # In-place on the live views (store.x = ... would shadow the backing array)
+    move = speed * dt
+    x, y = store.x, store.y
+    x += DIR_X[approach] * move
+    y += DIR_Y[approach] * move
+
+
+class ArrayVehicleManager:
+    """VehicleManager stand-in backed by a VehicleArrays store.
+
+    Implements what SimulationEngine, the game modes and Metrics use:
+    update(), get_lane_info(), spawn_vehicle(), `vehicles` (slot indices
+    per approach), `spawn_timer`, `next_id`, the per-update `events` list
+    and the `exited` / `exit_waits` totals. Events carry VehicleRecord
+    snapshots instead of Vehicle objects. All vehicles move in one
+    vectorized step under the same spawn rules; no record/replay or
+    network handoff. Drawn by renderer.ArrayVehicleView.
+    """
+
+    def __init__(self, road_info, spawn_interval=(1.2, 3.0), clock=None, rng=None, vehicle_rng=None):
+        self.road_info = road_info
+        self.store = VehicleArrays()
+        self.spawn_timer = 0.5 # Start fast
+        self.spawn_interval = spawn_interval
+        self.next_id = 0
+        self.owns_clock = clock is None
+        self.clock = clock or SimClock()
+        self.rng = rng or random
+        self.vehicle_rng = vehicle_rng or self.rng
+
+        stops = road_info["stop_lines"]
+        self.stop_progress = np.array([
+            stops[d] * DIR_X[i] + stops[d] * DIR_Y[i] for i, d in enumerate(APPROACHES)
+        ])
+        self.non_ambulance_types = [TYPE_CODE[k] for k in TYPE_NAMES if k != "Ambulance"]
+
+        self._lanes = None      # Cached _lane_table(); dropped whenever the store changes
+        self.events = []        # (kind, VehicleRecord) raised by the last update(), as in VehicleManager
+        self.exited = 0
+        self.exit_waits = []
+
+    @property
+    def current_time(self):
+        return self.clock.now
+
+    @property
+    def vehicles(self):
+        """Per-approach slot indices, mirroring VehicleManager.vehicles."""
+        return {d: slots for d, (slots, _, _) in self._lane_table().items()}
+
+    def get_lane_info(self, direction):
+        """Returns (queue_length, max_wait_time) for the given lane (vehicles before the stop line)."""
+        _, queue_length, oldest = self._lane_table()[direction]
+        if not queue_length:
+            return 0, 0
+        return queue_length, self.current_time - oldest
+
+    def _lane_table(self):
+        """approach -> (slot indices, uncrossed count, oldest uncrossed spawn time).
+
+        Built in one vectorized pass the first time it is read after the
+        store changed, so per-tick readers (Metrics, the controller,
+        telemetry) share it instead of each scanning the store.
+        """
+        if self._lanes is None:
+            store = self.store
+            approach = store.approach
+            order = np.argsort(approach, kind="stable")
+            slots = np.split(order, np.cumsum(np.bincount(approach, minlength=4))[:-1])
+            waiting = np.flatnonzero(~store.crossed)
+            queued = np.bincount(approach[waiting], minlength=4)
+            # Slots stay in spawn order (appends, stable compaction): the first waiting slot is the oldest
+            codes, first = np.unique(approach[waiting], return_index=True)
+            oldest = [None] * len(APPROACHES)
+            for code, i in zip(codes, first):
+                oldest[code] = float(store.spawn_time[waiting[i]])
+            self._lanes = {d: (slots[i], int(queued[i]), oldest[i]) for i, d in enumerate(APPROACHES)}
+        return self._lanes
+
+    def update(self, dt, light_states):
+        if self.owns_clock:
+            self.clock.advance(dt)
+        self.events = []
+        self.spawn_timer -= dt
+        if self.spawn_timer <= 0:
+            direction = self.rng.choice(["N", "S", "E", "W"])
+
+            # 10% chance of Ambulance
+            is_ambulance = self.rng.random() < 0.1
+
+            self.spawn_vehicle(direction, is_ambulance)
+            self.spawn_timer = self.rng.uniform(*self.spawn_interval)
+
+        light_codes = np.array([LIGHT_CODE[light_states.get(d, "red")] for d in APPROACHES])
+        store = self.store
+        step_vehicles(store, dt, self.stop_progress, light_codes)
+
+        # Waiting, stops and stop-line crossings, as VehicleManager counts them
+        slow = store.speed < STOPPED_SPEED
+        store.wait[slow] += dt
+        new_stops = slow & ~store.stopped
+        store.stops[new_stops] += 1
+        store.stopped[:] = slow
+        self._emit("stop", np.flatnonzero(new_stops))
+        new_crossed = ~store.crossed & (store.progress() > self.stop_progress[store.approach])
+        store.crossed[new_crossed] = True
+        self._emit("cross", np.flatnonzero(new_crossed))
+
+        # Check bounds (keep if within reasonable area)
+        x, y = store.x, store.y
+        inside = (-200 < x) & (x < 1200) & (-200 < y) & (y < 900)
+        if not inside.all():
+            gone = ~inside
+            self._emit("exit", np.flatnonzero(gone))
+            self.exited += int(gone.sum())
+            self.exit_waits.extend(store.wait[gone].tolist())
+            store.keep(inside)
+        self._lanes = None
+
+    def _emit(self, kind, slots):
+        store = self.store
+        for i in slots:
+            self.events.append((kind, VehicleRecord(int(store.id[i]), APPROACHES[store.approach[i]],
+                                                    float(store.wait[i]), int(store.stops[i]))))
+
+    def lane_start(self, direction, is_ambulance):
+        start_x, start_y = self.road_info["starts"][direction]
+        off_x, off_y = LANE_OFFSETS[direction][SHOULDER_LANE if is_ambulance else MAIN_LANE]
+        return start_x + off_x, start_y + off_y
+
+    def spawn_vehicle(self, direction, is_ambulance=False):
+        x, y = self.lane_start(direction, is_ambulance)
+        code = APPROACH_CODE[direction]
+        lane = SHOULDER_LANE if is_ambulance else MAIN_LANE
+
+        # Same-lane clearance check against everything near the entry point
+        store = self.store
+        if store.count:
+            start_progress = x * DIR_X[code] + y * DIR_Y[code]
+            same_lane = (store.approach == code) & (store.lane == lane)
+            if np.any(same_lane & (np.abs(store.progress() - start_progress) < 80)):
+                return
+
+        type_code = TYPE_CODE["Ambulance"] if is_ambulance else self.vehicle_rng.choice(self.non_ambulance_types)
+        self.add_vehicle(direction, type_code, x, y, is_ambulance)
+
+    def add_vehicle(self, direction, type_code, x, y, is_ambulance=False):
+        """Insert a vehicle without the spawn clearance check (stress scenarios)."""
+        max_speed = TYPE_SPEED[type_code]
+        slot = self.store.append(
+            id=self.next_id, x=x, y=y, speed=max_speed, length=TYPE_LENGTH[type_code],
+            max_speed=max_speed, spawn_time=self.current_time,
+            approach=APPROACH_CODE[direction], lane=SHOULDER_LANE if is_ambulance else MAIN_LANE,
+            type=type_code, ambulance=is_ambulance,
+        )
+        self.next_id += 1
+        self._lanes = None
+        self._emit("spawn", [slot])